@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark: per-country output of currency_last_month_data.save_data.
+
+Compares, on a synthetic multi-year payload, the original per-country loop
+(one boolean filter over the whole DataFrame per country, files written one
+after another) with write_country_files (single groupby pass, files written
+from a thread pool) and its partitioned Parquet dataset option.
+
+Usage:
+    python benchmark_save_data.py
+"""
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from currency_last_month_data import write_country_files
+
+# (number of countries, months of history)
+PAYLOAD_SIZES = [(120, 12), (200, 120), (400, 360)]
+
+
+def synthetic_rates(countries, months):
+    """Build a DataFrame shaped like process_xml_to_csv output"""
+    country_codes = [f"C{i:03d}" for i in range(countries)]
+    dates = [f"{2000 + m // 12}{m % 12 + 1:02d}" for m in range(months)]
+    return pd.DataFrame({
+        'Country': np.repeat(country_codes, months),
+        'Currency': np.repeat([f"X{i:02d}" for i in range(countries)], months),
+        'Date': np.tile(dates, countries),
+        'Exchange_Rate': np.random.rand(countries * months),
+        'Base_Currency': 'USD',
+        'Timestamp': pd.Timestamp.now().isoformat(),
+    })
+
+
+def write_country_files_loop(df, output_dir, year_month_str):
+    """The original implementation: one full boolean filter and one sequential write per country"""
+    for country in df['Country'].unique():
+        country_df = df[df['Country'] == country]
+        country_file = os.path.join(output_dir, f"exchange_rates_{year_month_str}_{country}.csv")
+        country_df.to_csv(country_file, index=False, encoding='utf-8-sig', sep=',')
+        print(f"Exchange rate data for {country} saved to: {country_file}")
+
+
+def timed(write, df, **kwargs):
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        write(df, tmp, "2025_11", **kwargs)
+        return time.perf_counter() - start
+
+
+def main():
+    print(f"{'rows':>8} {'countries':>9} | {'filter loop':>11} | {'groupby + threads':>17} {'speedup':>7} | "
+          f"{'partitioned':>11} {'speedup':>7}")
+
+    for countries, months in PAYLOAD_SIZES:
+        df = synthetic_rates(countries, months)
+
+        loop = timed(write_country_files_loop, df)
+        threaded = timed(write_country_files, df)
+        partitioned = timed(write_country_files, df, partitioned=True)
+
+        print(f"{len(df):>8} {countries:>9} | {loop:>10.2f}s | {threaded:>16.2f}s {loop / threaded:>6.1f}x | "
+              f"{partitioned:>10.2f}s {loop / partitioned:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+"""
+Benchmark: SDMX-ML (XML) vs SDMX-CSV responses.
+
+Generates the same synthetic IMF exchange rate data in both representations and
+compares the bytes transferred (raw, and gzip-compressed as sent with
+Accept-Encoding: gzip) and the time to parse each payload into column buffers
+and build the exchange rate DataFrame.
+
+Usage:
+    python benchmark_sdmx_formats.py
+"""
+import gzip
+import os
+import tempfile
+import time
+
+from benchmark_xml_parser import write_synthetic_payload
+from utils.exchange_rate_fetcher import columns_to_dataframe, parse_sdmx_csv, parse_sdmx_xml
+
+# (number of series, months per series)
+PAYLOAD_SIZES = [(200, 12), (200, 60), (200, 240), (800, 240)]
+
+
+def write_synthetic_csv(path, series_count, months):
+    """Writes an SDMX-CSV payload with the same observations as write_synthetic_payload."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("DATAFLOW,COUNTRY,INDICATOR,TYPE_OF_TRANSFORMATION,FREQUENCY,TIME_PERIOD,OBS_VALUE\n")
+        for i in range(series_count):
+            for m in range(months):
+                year, month = 2000 + m // 12, m % 12 + 1
+                f.write(f"IMF.STA:ER(4.0.1),C{i:03d},USD_XDC,PA_RT,M,{year}-M{month:02d},"
+                        f"{1 + i / 1000 + m / 100000}\n")
+
+
+def transfer_sizes(path):
+    with open(path, "rb") as f:
+        body = f.read()
+    return len(body), len(gzip.compress(body))
+
+
+def parse_time(parse, path):
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        columns = parse(f)
+    df = columns_to_dataframe(columns, {})
+    return time.perf_counter() - start, df
+
+
+def main():
+    kb = 1024
+    print(f"{'observations':>12} | {'XML KB':>9} {'gzip':>7} {'parse':>7} | "
+          f"{'CSV KB':>9} {'gzip':>7} {'parse':>7} | {'bytes':>6} {'speedup':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for series_count, months in PAYLOAD_SIZES:
+            xml_path = os.path.join(tmp, f"payload_{series_count}_{months}.xml")
+            csv_path = os.path.join(tmp, f"payload_{series_count}_{months}.csv")
+            write_synthetic_payload(xml_path, series_count, months)
+            write_synthetic_csv(csv_path, series_count, months)
+
+            xml_raw, xml_gzip = transfer_sizes(xml_path)
+            csv_raw, csv_gzip = transfer_sizes(csv_path)
+            xml_time, xml_df = parse_time(parse_sdmx_xml, xml_path)
+            csv_time, csv_df = parse_time(parse_sdmx_csv, csv_path)
+
+            # Both representations must produce the same exchange rates
+            columns = ['Country', 'Date', 'Exchange_Rate', 'Base_Currency']
+            assert xml_df[columns].reset_index(drop=True).equals(csv_df[columns].reset_index(drop=True))
+
+            print(f"{series_count * months:>12} | {xml_raw / kb:>9.0f} {xml_gzip / kb:>7.0f} {xml_time:>6.2f}s | "
+                  f"{csv_raw / kb:>9.0f} {csv_gzip / kb:>7.0f} {csv_time:>6.2f}s | "
+                  f"{xml_raw / csv_raw:>5.1f}x {xml_time / csv_time:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""
+Benchmark: in-memory vs streaming SDMX-ML parsing.
+
+Generates synthetic IMF exchange rate payloads of increasing size and compares
+the peak memory of the original approach (whole response text + full element
+tree + one dict per observation) with the streaming parser used by
+utils.exchange_rate_fetcher.parse_sdmx_xml.
+
+"Parser overhead" is the peak memory minus the memory still held by the parsed
+columns afterwards, i.e. what the parser needs on top of its output. For the
+streaming parser it stays flat as the payload grows.
+
+Usage:
+    python benchmark_xml_parser.py
+"""
+import os
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from utils.exchange_rate_fetcher import parse_sdmx_xml
+
+# (number of series, months per series)
+PAYLOAD_SIZES = [(200, 12), (200, 60), (200, 240), (800, 240)]
+
+
+def write_synthetic_payload(path, series_count, months):
+    """Writes an SDMX-ML payload shaped like the IMF ER dataflow response."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<?xml version="1.0" encoding="utf-8"?>')
+        f.write('<message:StructureSpecificData '
+                'xmlns:message="http://www.sdmx.org/resources/sdmxml/schemas/v2_1/message">')
+        f.write('<message:Header/><message:DataSet>')
+        for i in range(series_count):
+            f.write(f'<Series COUNTRY="C{i:03d}" INDICATOR="USD_XDC" '
+                    f'TYPE_OF_TRANSFORMATION="PA_RT" FREQUENCY="M">')
+            for m in range(months):
+                year, month = 2000 + m // 12, m % 12 + 1
+                f.write(f'<Obs TIME_PERIOD="{year}-M{month:02d}" OBS_VALUE="{1 + i / 1000 + m / 100000}"/>')
+            f.write('</Series>')
+        f.write('</message:DataSet></message:StructureSpecificData>')
+
+
+def parse_in_memory(path):
+    """The original approach: read the full text, build the tree, then a dict per Obs."""
+    with open(path, "r", encoding="utf-8") as f:
+        xml_data = f.read()
+    root = ET.fromstring(xml_data)
+    data_list = []
+    for series in root.findall(".//Series"):
+        for obs in series.findall('Obs'):
+            data_list.append({
+                'Country': series.get('COUNTRY'),
+                'Date': obs.get('TIME_PERIOD').replace('-M', ''),
+                'Exchange_Rate': float(obs.get('OBS_VALUE')),
+                'Base_Currency': 'USD',
+            })
+    return data_list
+
+
+def parse_streaming(path):
+    with open(path, "rb") as f:
+        return parse_sdmx_xml(f)
+
+
+def measure(parse, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = parse(path)
+    elapsed = time.perf_counter() - start
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed, peak, peak - retained
+
+
+def main():
+    mb = 1024 * 1024
+    print(f"{'observations':>12} {'payload MB':>10} | {'in-memory peak':>14} {'overhead':>9} {'time':>7} | "
+          f"{'streaming peak':>14} {'overhead':>9} {'time':>7}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for series_count, months in PAYLOAD_SIZES:
+            path = os.path.join(tmp, f"payload_{series_count}_{months}.xml")
+            write_synthetic_payload(path, series_count, months)
+            size = os.path.getsize(path)
+
+            mem_time, mem_peak, mem_overhead = measure(parse_in_memory, path)
+            str_time, str_peak, str_overhead = measure(parse_streaming, path)
+
+            print(f"{series_count * months:>12} {size / mb:>10.1f} | "
+                  f"{mem_peak / mb:>11.1f} MB {mem_overhead / mb:>6.1f} MB {mem_time:>6.2f}s | "
+                  f"{str_peak / mb:>11.1f} MB {str_overhead / mb:>6.1f} MB {str_time:>6.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,55 +2,16 @@ import urllib.request
 import xml.etree.ElementTree as ET
 import pandas as pd
 from datetime import datetime, timedelta
+import gzip
 import os
-import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pyarrow as pa
+import pyarrow.parquet as pq
 
-# --- Global cache for country currency codes ---
-# This dictionary will store country codes and their currency to avoid repeated API calls.
-currency_cache = {}
-
-# --- Hardcoded overrides for specific country/region codes ---
-# Requirement 1 & 2: Handle special cases for specific codes.
-SPECIAL_CURRENCY_OVERRIDES = {
-    'CUW': 'XCG',  # Curaçao
-    'SXM': 'XCG',  # Sint Maarten
-    'G163': 'EUR'  # G163 Group, Actually Eurozone
-}
-
-def get_official_currency(country_code):
-    """
-    Fetches the official currency code for a given country using the REST Countries API.
-    Uses a local cache and special overrides to avoid redundant or incorrect API calls.
-    
-    :param country_code: The 3-letter ISO code for the country.
-    :return: The 3-letter currency code (e.g., 'AWG') or None if not found.
-    """
-    # First, check for special overrides
-    if country_code in SPECIAL_CURRENCY_OVERRIDES:
-        return SPECIAL_CURRENCY_OVERRIDES[country_code]
-
-    # Second, check cache
-    if country_code in currency_cache:
-        return currency_cache[country_code]
-
-    try:
-        url = f"https://restcountries.com/v3.1/alpha/{country_code}"
-        req = urllib.request.Request(url, headers={'User-Agent': 'Python-Currency-App/1.0'})
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.getcode() == 200:
-                data = json.loads(response.read().decode("utf-8"))
-                if data and 'currencies' in data[0]:
-                    # Get the first currency code from the currencies object
-                    currency_code_3_letter = list(data[0]['currencies'].keys())[0]
-                    # Store in cache
-                    currency_cache[country_code] = currency_code_3_letter
-                    return currency_code_3_letter
-    except Exception as e:
-        print(f"Warning: Could not fetch currency for {country_code}. Error: {e}")
-    
-    # Cache the failure to avoid retrying
-    currency_cache[country_code] = None
-    return None
+# --- Country currency resolution ---
+# Shares the special overrides and the persistent on-disk currency cache with the
+# flow-based fetcher, so repeated runs do not repeat the REST Countries lookups.
+from utils.exchange_rate_fetcher import resolve_currencies
 
 def get_currency_data(start_date, end_date):
     """
@@ -91,13 +52,18 @@ def process_xml_to_csv(xml_data):
     # Get the timestamp for when the data is being processed
     fetch_timestamp = datetime.now().isoformat()
     
+    all_series = root.findall(".//Series")
+
+    # Requirement 1: Resolve every country's official currency in one batched lookup
+    currencies = resolve_currencies(series.get('COUNTRY') for series in all_series)
+
     # Iterate over all Series nodes
-    for series in root.findall(".//Series"):
+    for series in all_series:
         country_code = series.get('COUNTRY')
         indicator = series.get('INDICATOR') # e.g., 'USD_XDC'
         
         # Requirement 1: Get the country's official currency
-        official_currency = get_official_currency(country_code)
+        official_currency = currencies[country_code]
         
         # Requirement 2: Determine the base currency from the indicator
         # For 'USD_XDC', the rate is of the country's currency vs USD.
@@ -133,17 +99,47 @@ def process_xml_to_csv(xml_data):
     
     return df
 
-def save_data(data, output_dir, year_month_str):
+def _write_country_file(country, country_df, output_dir, year_month_str):
+    country_file = os.path.join(output_dir, f"exchange_rates_{year_month_str}_{country}.csv")
+    # Add encoding and separator parameters
+    country_df.to_csv(country_file, index=False, encoding='utf-8-sig', sep=',')
+    return country_file
+
+def write_country_files(df, output_dir, year_month_str, max_workers=8, partitioned=False):
+    """
+    Saves the data of each country separately.
+    Rows are split by country in a single groupby pass, and the per-country CSV files
+    are written concurrently. With partitioned=True, a single Parquet dataset
+    partitioned by country is written instead of one CSV per country.
+    """
+    if partitioned:
+        dataset_dir = os.path.join(output_dir, f"exchange_rates_{year_month_str}_by_country")
+        table = pa.Table.from_pandas(df.astype({'Country': str}), preserve_index=False)
+        pq.write_to_dataset(table, dataset_dir, partition_cols=['Country'], existing_data_behavior='delete_matching')
+        print(f"Exchange rate data by country saved to: {dataset_dir}")
+        return
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {
+            pool.submit(_write_country_file, country, country_df, output_dir, year_month_str): country
+            for country, country_df in df.groupby('Country', sort=False)
+        }
+        for future in as_completed(futures):
+            print(f"Exchange rate data for {futures[future]} saved to: {future.result()}")
+
+def save_data(data, output_dir, year_month_str, partitioned=False):
     """
     Saves the raw XML data and the processed CSV data.
+    With partitioned=True, the per-country data is saved as one Parquet dataset
+    instead of one CSV file per country.
     """
     # Create output directory
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
     
-    # Save raw XML data
-    xml_file = os.path.join(output_dir, f"raw_exchange_rates_{year_month_str}.xml")
-    with open(xml_file, "w", encoding="utf-8") as f:
+    # Save raw XML data, gzip-compressed
+    xml_file = os.path.join(output_dir, f"raw_exchange_rates_{year_month_str}.xml.gz")
+    with gzip.open(xml_file, "wt", encoding="utf-8") as f:
         f.write(data)
     print(f"Raw XML data saved to: {xml_file}")
     
@@ -158,13 +154,8 @@ def save_data(data, output_dir, year_month_str):
     df.to_csv(csv_file, index=False, encoding='utf-8-sig', sep=',')
     print(f"Processed CSV data saved to: {csv_file}")
     
-    # Modify the part for saving individual country data
-    for country in df['Country'].unique():
-        country_df = df[df['Country'] == country]
-        country_file = os.path.join(output_dir, f"exchange_rates_{year_month_str}_{country}.csv")
-        # Add encoding and separator parameters
-        country_df.to_csv(country_file, index=False, encoding='utf-8-sig', sep=',')
-        print(f"Exchange rate data for {country} saved to: {country_file}")
+    # Save individual country data
+    write_country_files(df, output_dir, year_month_str, partitioned=partitioned)
 
 def main():
     """
@@ -1,57 +1,300 @@
+import asyncio
+import hashlib
 import os
-import pandas as pd
-from prefect import flow, get_run_logger
-from prefect.artifacts import create_table_artifact, create_markdown_artifact
-from utils.exchange_rate_fetcher import fetch_last_month_rates
+from datetime import timedelta
+from pathlib import Path
+from prefect import flow, get_run_logger, task
+from prefect.cache_policies import NO_CACHE
+from prefect.futures import wait
+from prefect.task_runners import ThreadPoolTaskRunner
+from utils import exchange_rate_fetcher, fx_store
+from utils.artifact_publisher import publish_dataframe
+from utils.cross_rates import build_missing_cross_rates
+from utils.exchange_rate_fetcher import (
+    archive_rates,
+    backfill_rates,
+    columns_to_dataframe,
+    FetchResult,
+    fetch_missing_rates,
+    fetch_months_async,
+    fetch_revisions,
+    find_missing_months,
+    last_month_period,
+    month_locks,
+    monthly_file_path,
+    parse_archived,
+    publish_csv,
+    resolve_currencies,
+    sync_fx_store,
+)
 
+# Task result caching: a download is reused for a short while (e.g. by a retried
+# run), a parse for as long as the payload (identified by its hash) is unchanged
+DOWNLOAD_CACHE_EXPIRATION = timedelta(hours=1)
+CURRENCIES_CACHE_EXPIRATION = timedelta(days=1)
 
-@flow(name="currency_acquisition_flow")
-def currency_acquisition_flow():
+# Parse results are only reused by the same parser code: a fix to the parser
+# (in utils/exchange_rate_fetcher.py) re-parses payloads that were already parsed
+PARSER_SOURCE_HASH = hashlib.sha256(Path(exchange_rate_fetcher.__file__).read_bytes()).hexdigest()[:16]
+
+
+def _download_cache_key(context, parameters):
+    return f"imf-download-{parameters['start_date']}-{parameters['end_date']}-{parameters.get('fmt', 'xml')}"
+
+
+def _parse_cache_key(context, parameters):
+    return f"imf-parse-{parameters['entry']['content_hash']}-{parameters.get('fmt', 'xml')}-{PARSER_SOURCE_HASH}"
+
+
+def _currencies_cache_key(context, parameters):
+    codes = ",".join(sorted(parameters['country_codes']))
+    return f"currencies-{hashlib.sha256(codes.encode('utf-8')).hexdigest()}"
+
+
+def publish_artifacts(result):
+    """
+    Publish the Prefect artifacts of an acquired FX month: a summary with per-currency
+    statistics (month-over-month change against the previous stored month), a sample
+    table and a link to the monthly CSV. Uses the DataFrame carried by the FetchResult;
+    a month that was already on disk is read from its CSV here.
+    """
+    logger = get_run_logger()
+
+    df = result.df
+    filename = os.path.basename(result.path)
+    logger.info(f"Data {'fetched' if result.fetched else 'loaded'}. Rows: {len(df)}")
+
+    # Previous month for the month-over-month change, e.g. 202501 -> 202412
+    previous_month = result.year_month - 1 if result.year_month % 100 > 1 else result.year_month - 89
+    history = fx_store.read_range(previous_month, previous_month, columns=['Currency', 'Date', 'Exchange_Rate'])
+
+    full_path = publish_dataframe(
+        df,
+        key="exchange-rates",
+        title=f"Currency Acquisition Report ({filename})",
+        details={
+            "File": filename,
+            "File Size": f"{result.file_size:,} bytes",
+            "Source": "fetched from IMF in this run" if result.fetched else "existing file",
+        },
+        history=history,
+        full_path=result.path,
+    )
+    logger.info(f"Successfully created artifacts; full data at {full_path}")
+
+
+@task(name="download_rates", retries=2, retry_delay_seconds=30, persist_result=True,
+      cache_key_fn=_download_cache_key, cache_expiration=DOWNLOAD_CACHE_EXPIRATION)
+def download_rates_task(start_date, end_date, fmt='xml'):
+    """Download the IMF response for a period into the raw response cache"""
+    return archive_rates(start_date, end_date, fmt)
+
+
+@task(name="parse_rates", persist_result=True, cache_key_fn=_parse_cache_key)
+def parse_rates_task(entry, fmt='xml'):
+    """Parse an archived IMF response into column buffers (an unparseable one is dropped from the archive)"""
+    return parse_archived(entry, fmt)
+
+
+@task(name="resolve_currencies", retries=2, retry_delay_seconds=10, persist_result=True,
+      cache_key_fn=_currencies_cache_key, cache_expiration=CURRENCIES_CACHE_EXPIRATION)
+def resolve_currencies_task(country_codes):
+    """Resolve the official currency of every country"""
+    return resolve_currencies(country_codes)
+
+
+@task(name="write_csv", cache_policy=NO_CACHE)
+def write_csv_task(df, full_path):
+    publish_csv(df, full_path)
+    return full_path
+
+
+@task(name="write_store", cache_policy=NO_CACHE)
+def write_store_task(df):
+    return fx_store.write_months(df)
+
+
+@task(name="publish_artifacts", retries=2, retry_delay_seconds=10, cache_policy=NO_CACHE)
+def publish_artifacts_task(result):
+    publish_artifacts(result)
+
+
+@task(name="catch_up_missing_months", cache_policy=NO_CACHE)
+def fetch_missing_rates_task():
+    return fetch_missing_rates()
+
+
+def acquire_last_month(logger):
+    """
+    Fetch last month's FX rates through the download, parse, resolve and write tasks.
+    Downloads and parses are cached by query and payload hash, so a retried run does
+    not repeat them; a payload that cannot be parsed is downloaded again. The CSV and
+    the FX store are written concurrently.
+
+    Returns:
+        FetchResult for last month
+    """
+    last_month = last_month_period()
+    fx_path = monthly_file_path(last_month)
+
+    # Single-flight with other runs (see fetch_last_month_result)
+    with month_locks([last_month]):
+        if os.path.exists(fx_path):
+            logger.info(f"Exchange rate file already exists: {fx_path}")
+            return FetchResult(fx_path, last_month)
+
+        period = f"{last_month // 100}-{last_month % 100:02d}"
+        entry = download_rates_task(period, period)
+        if entry is None:
+            raise Exception("No exchange rate data found for the specified period")
+
+        try:
+            columns = parse_rates_task(entry)
+        except Exception as e:
+            # The unparseable payload was dropped from the archive; download it once more,
+            # replacing the cached download so a retried run does not reuse it either
+            logger.warning(f"Archived IMF response could not be parsed ({e}), downloading it again")
+            entry = download_rates_task.with_options(refresh_cache=True)(period, period)
+            if entry is None:
+                raise Exception("No exchange rate data found for the specified period")
+            columns = parse_rates_task(entry)
+
+        if not columns['Country']:
+            raise Exception("No exchange rate data found for the specified period")
+
+        currencies = resolve_currencies_task(sorted(set(columns['Country'])))
+        df = columns_to_dataframe(columns, currencies)
+
+        csv_future = write_csv_task.submit(df, fx_path)
+        store_future = write_store_task.submit(df)
+        wait([csv_future, store_future])
+        csv_future.result()
+        store_future.result()
+
+    logger.info(f"Exchange rate data saved to: {fx_path}")
+    return FetchResult(fx_path, last_month, df)
+
+
+@flow(name="currency_acquisition_flow", task_runner=ThreadPoolTaskRunner(max_workers=4))
+def currency_acquisition_flow(
+    backfill_start: str = "",
+    backfill_end: str = "",
+    catch_up: bool = True,
+    fetch_updates: bool = True,
+):
     """
     Fetch last month's FX rates (idempotent).
     Scheduled monthly via Prefect Cloud.
+
+    Args:
+        backfill_start: Optional first month ('YYYY-MM') of a historical backfill.
+                        Months already present in data/ are skipped.
+        backfill_end: Optional last month ('YYYY-MM') of the backfill,
+                      defaults to last month.
+        catch_up: Fetch every month missing from data/ since the earliest stored
+                  month (e.g. after a skipped run) in a single IMF request.
+        fetch_updates: Merge IMF revisions published since the previous run into
+                       the months already stored in data/.
     """
     logger = get_run_logger()
+
+    if backfill_start:
+        logger.info(f"Backfilling FX rates from {backfill_start} to {backfill_end or 'last month'}...")
+        written = backfill_rates(backfill_start, backfill_end or None)
+        logger.info(f"Backfill complete: {len(written)} monthly files written")
+
+    # The catch-up runs alongside last month's fetch; the per-month locks make sure
+    # a month both of them need is fetched only once
+    catch_up_future = fetch_missing_rates_task.submit() if catch_up else None
+
     logger.info("Running monthly FX acquisition task...")
 
-    fx_path = fetch_last_month_rates()
+    result = acquire_last_month(logger)
+    fx_path = result.path
 
     logger.info(f"FX acquisition complete: {fx_path}")
 
-    # Create Prefect Artifact
+    # Artifacts only need last month's data, so they are published while the
+    # remaining steps run; a publication failure is retried on its own
+    artifacts_future = publish_artifacts_task.submit(result)
+
+    if catch_up_future is not None:
+        written = catch_up_future.result()
+        if written:
+            logger.info(f"Caught up {len(written)} missing months: {sorted(written)}")
+
+    if fetch_updates:
+        revised = fetch_revisions()
+        if revised:
+            logger.info(f"Merged IMF revisions into {len(revised)} months: {sorted(revised)}")
+
+    imported = sync_fx_store()
+    if imported:
+        logger.info(f"Imported {len(imported)} months into the FX store: {imported}")
+
+    # Precompute the cross-rate matrices of new or revised months
+    built = build_missing_cross_rates()
+    if built:
+        logger.info(f"Built cross-rate matrices for {len(built)} months: {built}")
+
+    try:
+        artifacts_future.result()
+    except Exception as e:
+        logger.error(f"Failed to create artifact: {e}")
+
+    return fx_path
+
+
+@flow(name="currency_acquisition_flow_async")
+async def currency_acquisition_flow_async(catch_up: bool = True, fetch_updates: bool = True):
+    """
+    Async variant of currency_acquisition_flow. Last month and any missing months are
+    downloaded concurrently on one event loop (see fetch_months_async), and each
+    month's files are written while the other downloads continue. The blocking
+    revision check, store sync and cross-rate build run in worker threads.
+
+    Args:
+        catch_up: Also fetch every month missing from data/ since the earliest stored month.
+        fetch_updates: Merge IMF revisions published since the previous run into
+                       the months already stored in data/.
+    """
+    logger = get_run_logger()
+
+    last_month = last_month_period()
+    fx_path = monthly_file_path(last_month)
+
+    months = await asyncio.to_thread(find_missing_months) if catch_up else []
+    if not catch_up and not os.path.exists(fx_path):
+        months = [last_month]
+
+    if months:
+        logger.info(f"Fetching {len(months)} months of FX rates: {months}")
+        written = await fetch_months_async(months)
+        logger.info(f"FX acquisition wrote {len(written)} monthly files")
+    else:
+        logger.info(f"Exchange rate file already exists: {fx_path}")
+
+    if not os.path.exists(fx_path):
+        raise Exception("No exchange rate data found for the specified period")
+
+    if fetch_updates:
+        revised = await asyncio.to_thread(fetch_revisions)
+        if revised:
+            logger.info(f"Merged IMF revisions into {len(revised)} months: {sorted(revised)}")
+
+    imported = await asyncio.to_thread(sync_fx_store)
+    if imported:
+        logger.info(f"Imported {len(imported)} months into the FX store: {imported}")
+
+    built = await asyncio.to_thread(build_missing_cross_rates)
+    if built:
+        logger.info(f"Built cross-rate matrices for {len(built)} months: {built}")
+
+    # Called from a worker thread, the artifact helpers take their synchronous path
     try:
-        df = pd.read_csv(fx_path)
-        filename = os.path.basename(fx_path)
-        row_count = len(df)
-        logger.info(f"Data loaded. Rows: {row_count}")
-        
-        # 1. Create a simple Markdown Summary (Lightweight, should always appear)
-        summary_md = f"""# Currency Acquisition Report
-- **File**: {filename}
-- **Date**: {pd.Timestamp.now()}
-- **Total Rows**: {row_count}
-"""
-        create_markdown_artifact(
-            key="exchange-rates-summary",
-            markdown=summary_md,
-            description="Execution Summary"
-        )
-
-        # 2. Create a Table Artifact (Native Data View)
-        # Convert DataFrame to list of dictionaries
-        table_data = df.to_dict('records')
-        
-        create_table_artifact(
-            key="exchange-rates-data",
-            table=table_data,
-            description=f"Exchange Rates Data ({filename})"
-        )
-        logger.info("Successfully created table and markdown artifacts.")
-        
+        await asyncio.to_thread(publish_artifacts, FetchResult(fx_path, last_month))
     except Exception as e:
         logger.error(f"Failed to create artifact: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
 
     return fx_path
 
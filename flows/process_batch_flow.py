@@ -1,44 +1,117 @@
 from prefect import flow, get_run_logger
-from utils.core_processor import run_core_processing
+from utils import batch_queue
+from utils.core_processor import (
+    DRAIN_MAX_WORKERS,
+    drain_queue,
+    enqueue_ready_manifests,
+    import_hotfolder_once,
+    load_manifest,
+    process_batch,
+)
 import os
-from pathlib import Path
 
 
-@flow(name="process_batch_flow", retries=2, retry_delay_seconds=10)
-def process_batch_flow(manifest_file: str = ""):
+# No flow-level retries: a failed batch has already been moved to the error folder, so a
+# retry would find nothing to do for it and end the run as Completed
+@flow(name="process_batch_flow")
+def process_batch_flow(
+    manifest_file: str = "",
+    drain: bool = False,
+    max_workers: int = DRAIN_MAX_WORKERS,
+    use_processes: bool = False,
+    rescan: bool = False,
+):
     """
     This flow processes a complete batch using the MANIFEST.json.
-    It is triggered automatically when a new manifest file is created.
+    It is triggered automatically when a new batch is enqueued.
+    Batches are claimed from the batch queue (see utils.batch_queue), so a batch is
+    processed by one run only and its outcome is recorded as DONE or FAILED.
     
     Args:
         manifest_file: Path to the manifest JSON file. If not provided, 
-                      automatically finds the latest manifest in the hotfolder.
+                      claims the oldest ready batch from the queue.
+        drain: If no manifest_file is given, process every ready batch in the
+               queue (oldest first) instead of only one, e.g. to clear a backlog
+               after downtime.
+        max_workers: Maximum number of batches processed at the same time when draining.
+        use_processes: Drain with a process pool (for CPU-bound processing) instead of threads.
+        rescan: First enqueue ready manifests found in the hotfolder that are not
+                in the queue yet (e.g. copied in by hand). Manifests already in the
+                hotfolder when the queue is first used are enqueued automatically.
     """
     logger = get_run_logger()
+
+    imported = import_hotfolder_once()
+    if imported:
+        logger.info(f"Enqueued {len(imported)} ready manifests already in the hotfolder")
+
+    batch_queue.requeue_stale()
+
+    if rescan:
+        added = enqueue_ready_manifests()
+        logger.info(f"Enqueued {len(added)} manifests found in the hotfolder")
+
+    if drain and not manifest_file:
+        return drain_batch_queue(max_workers, use_processes)
     
-    # If no manifest file provided, find the latest one
-    if not manifest_file:
-        hotfolder = r"C:\DATA_PIPELINE\3_processing_hotfolder"
-        os.makedirs(hotfolder, exist_ok=True)
-        
-        # Find all manifest files
-        manifest_files = list(Path(hotfolder).glob("*_MANIFEST.json"))
-        
-        if not manifest_files:
-            logger.error("No manifest files found in hotfolder")
-            raise FileNotFoundError(f"No manifest files found in {hotfolder}")
-        
-        # Get the latest manifest file
-        manifest_file = str(max(manifest_files, key=os.path.getctime))
-        logger.info(f"Found latest manifest: {manifest_file}")
+    if manifest_file:
+        # A manifest named by an event: claim it, unless another run already has
+        if os.path.exists(manifest_file):
+            batch_id = load_manifest(manifest_file)["batch_id"]
+            batch_queue.enqueue(batch_id, manifest_file)
+        else:
+            # Already moved to the archive or error folder, e.g. a repeated event
+            batch_id = os.path.basename(manifest_file).removesuffix("_MANIFEST.json")
+            if batch_queue.batch_status(batch_id) is None:
+                logger.error(f"Manifest file not found: {manifest_file}")
+                raise FileNotFoundError(f"Manifest file not found: {manifest_file}")
+        if not batch_queue.claim(batch_id):
+            status = batch_queue.batch_status(batch_id)
+            logger.warning(f"Batch {batch_id} is {status}, not ready; skipping")
+            return None
+    else:
+        # If no manifest file provided, claim the next ready batch
+        batch = batch_queue.claim_next()
+        if batch is None:
+            logger.error("No ready batches in the queue")
+            raise FileNotFoundError(f"No ready batches in {batch_queue.QUEUE_PATH}")
+        batch_id, manifest_file = batch
+        logger.info(f"Claimed batch {batch_id}: {manifest_file}")
     
     logger.info(f"Processing batch from manifest: {manifest_file}")
     
-    run_core_processing(manifest_file)
+    process_batch(batch_id, manifest_file)
     
     logger.info("Batch processing completed successfully.")
 
 
+def drain_batch_queue(max_workers, use_processes):
+    """
+    Process every ready batch in the queue. The run's outcome depends only on the
+    batches it claimed: it fails if any of them failed.
+    """
+    logger = get_run_logger()
+
+    pool_kind = "processes" if use_processes else "threads"
+    logger.info(f"Draining ready batches with up to {max_workers} {pool_kind}...")
+
+    processed, failed = drain_queue(max_workers, use_processes)
+
+    total = len(processed) + len(failed)
+    if not total:
+        logger.info("No ready batches in the queue")
+        return []
+
+    logger.info(f"Processed {len(processed)} of {total} batches successfully.")
+    for path, error in failed.items():
+        logger.error(f"Batch {os.path.basename(path)} failed: {error}")
+
+    if failed:
+        raise Exception(f"{len(failed)} of {total} batches failed and were moved to the error folder")
+
+    return processed
+
+
 if __name__ == "__main__":
     # for debugging only
     process_batch_flow()
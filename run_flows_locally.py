@@ -5,7 +5,7 @@
 可以通过 Task Scheduler 或 cron 调度执行
 """
 import asyncio
-from flows.currency_acquisition_flow import currency_acquisition_flow
+from flows.currency_acquisition_flow import currency_acquisition_flow_async
 from flows.prepare_batch_flow import prepare_batch_flow
 from flows.process_batch_flow import process_batch_flow
 from datetime import datetime
@@ -22,16 +22,16 @@ logger = logging.getLogger(__name__)
 async def run_currency_acquisition():
     """运行汇率获取 Flow"""
     logger.info("=" * 70)
-    logger.info("Starting: currency_acquisition_flow")
+    logger.info("Starting: currency_acquisition_flow_async")
     logger.info("=" * 70)
     
     try:
-        result = currency_acquisition_flow()
-        logger.info(f"✅ currency_acquisition_flow completed successfully")
+        result = await currency_acquisition_flow_async()
+        logger.info(f"✅ currency_acquisition_flow_async completed successfully")
         logger.info(f"Result: {result}")
         return True
     except Exception as e:
-        logger.error(f"❌ currency_acquisition_flow failed: {str(e)}")
+        logger.error(f"❌ currency_acquisition_flow_async failed: {str(e)}")
         return False
 
 
@@ -58,7 +58,8 @@ async def run_process_batch():
     logger.info("=" * 70)
     
     try:
-        result = process_batch_flow()
+        # Drain mode: clear every ready batch, including any backlog after downtime
+        result = process_batch_flow(drain=True)
         logger.info(f"✅ process_batch_flow completed successfully")
         logger.info(f"Result: {result}")
         return True
@@ -0,0 +1,171 @@
+import os
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+from prefect.artifacts import create_link_artifact, create_markdown_artifact, create_table_artifact
+
+# Full datasets referenced by link artifacts are written here
+ARTIFACT_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "artifacts")
+
+# Bounds on what is sent to the Prefect API
+SAMPLE_ROWS = 50    # Rows in the sample table
+TOP_N = 20          # Currencies listed in the summary (largest month-over-month moves first)
+PAGE_SIZE = 500     # Rows per paged table artifact
+MAX_PAGES = 20      # Paged table artifacts per dataset; the full data is always in the linked file
+
+
+def summary_statistics(df, group_col='Currency', value_col='Exchange_Rate', date_col='Date', history=None):
+    """
+    Computes per-group statistics in a few vectorized passes.
+
+    Args:
+        df: DataFrame with group, value and integer YYYYMM date columns
+        group_col: Column to group by, e.g. 'Currency'
+        value_col: Numeric column to summarize, e.g. 'Exchange_Rate'
+        date_col: Month column used for the month-over-month change
+        history: Optional earlier rows with the same columns, used only for the
+                 month-over-month change (e.g. the previous month from the FX store)
+
+    Returns:
+        DataFrame indexed by group with 'count', 'min', 'max', 'mean', 'latest' and
+        'mom_change_pct' (change of the monthly mean between the last two months with
+        data, in percent; NaN if the group has a single month)
+    """
+    stats = df.groupby(group_col, observed=True)[value_col].agg(['count', 'min', 'max', 'mean'])
+
+    # Monthly means, sorted by group and month; keep each group's last two months
+    rows = df if history is None else pd.concat([history[[group_col, date_col, value_col]], df], ignore_index=True)
+    monthly = rows.groupby([group_col, date_col], observed=True)[value_col].mean().dropna()
+    last_two = monthly.groupby(level=group_col, observed=True).tail(2).groupby(level=group_col, observed=True)
+    latest = last_two.last()
+    previous = last_two.first().where(last_two.size() == 2)
+
+    stats['latest'] = latest
+    stats['mom_change_pct'] = (latest / previous - 1) * 100
+    return stats
+
+
+def _records(df):
+    """Convert rows to JSON-safe records (categoricals as strings, NaN as None)"""
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict('records')
+
+
+def sample_rows(df, n=SAMPLE_ROWS):
+    """A reproducible sample of at most n rows, kept in the original order"""
+    if len(df) <= n:
+        return df
+    return df.sample(n, random_state=0).sort_index()
+
+
+def save_full_data(df, key):
+    """
+    Writes the full dataset to a timestamped CSV under ARTIFACT_DIR. Only the latest
+    file per key is kept; earlier ones are deleted.
+
+    Returns:
+        Absolute path of the written file
+    """
+    directory = os.path.abspath(os.path.join(ARTIFACT_DIR, key))
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{key}_{datetime.now():%Y%m%d_%H%M%S}.csv")
+    df.to_csv(path, index=False, encoding='utf-8-sig', sep=',')
+
+    for old in Path(directory).glob(f"{key}_*.csv"):
+        if str(old) != path:
+            try:
+                old.unlink()
+            except OSError as e:
+                print(f"Warning: Could not delete old artifact data {old}: {e}")
+    return path
+
+
+def publish_table_pages(df, key, description, page_size=PAGE_SIZE, max_pages=MAX_PAGES):
+    """
+    Publishes a table as consecutive paged table artifacts ('<key>-page-1', ...),
+    each holding at most page_size rows. At most max_pages pages are published.
+
+    Returns:
+        Number of pages published
+    """
+    pages = min(-(-len(df) // page_size), max_pages)
+    for page in range(pages):
+        rows = df.iloc[page * page_size:(page + 1) * page_size]
+        create_table_artifact(
+            key=f"{key}-page-{page + 1}",
+            table=_records(rows),
+            description=f"{description} (rows {page * page_size + 1}-{page * page_size + len(rows)} of {len(df)})",
+        )
+    return pages
+
+
+def publish_dataframe(df, key, title, group_col='Currency', value_col='Exchange_Rate', date_col='Date',
+                      paged=False, top_n=TOP_N, sample_size=SAMPLE_ROWS, details=None, history=None,
+                      full_path=None):
+    """
+    Publishes a dataset as bounded Prefect artifacts instead of one table of every row:
+    - '<key>-summary': markdown report with row counts and per-group statistics
+      (the top_n groups with the largest month-over-month moves)
+    - '<key>-data': table artifact with a sample of at most sample_size rows
+    - '<key>-page-N': the rows in paged table artifacts, if paged=True
+    - '<key>-full': link artifact to a local CSV holding the full dataset (full_path if
+      the data is already on disk, else a copy written by save_full_data)
+
+    Args:
+        df: DataFrame to publish
+        key: Artifact key prefix (lowercase letters, numbers and dashes)
+        title: Title of the summary report
+        group_col, value_col, date_col: Columns used for the summary statistics;
+                                        statistics are skipped if any is missing
+        paged: Also publish the rows as paged table artifacts
+        top_n: Number of groups listed in the summary
+        sample_size: Number of rows in the sample table
+        details: Optional dict of extra facts listed in the summary report
+        history: Optional earlier rows for the month-over-month change (see summary_statistics)
+        full_path: Optional existing file holding the full dataset, linked instead of a copy
+
+    Returns:
+        Path of the local CSV with the full dataset
+    """
+    full_path = os.path.abspath(full_path) if full_path else save_full_data(df, key)
+
+    lines = [
+        f"# {title}",
+        f"- **Date**: {pd.Timestamp.now()}",
+        f"- **Total Rows**: {len(df)}",
+        f"- **Columns**: {', '.join(map(str, df.columns))}",
+        f"- **Full Data**: {full_path}",
+    ]
+    lines += [f"- **{name}**: {value}" for name, value in (details or {}).items()]
+    if {group_col, value_col, date_col}.issubset(df.columns) and not df.empty:
+        stats = summary_statistics(df, group_col, value_col, date_col, history)
+        movers = stats.reindex(stats['mom_change_pct'].abs().sort_values(ascending=False, na_position='last').index)
+        lines += [
+            f"- **Months**: {df[date_col].min()} to {df[date_col].max()}",
+            f"- **{group_col} Count**: {len(stats)}",
+            "",
+            f"## {group_col} statistics (top {min(top_n, len(stats))} by month-over-month change)",
+            "",
+            movers.head(top_n).to_markdown(floatfmt=".6g"),
+        ]
+
+    create_markdown_artifact(key=f"{key}-summary", markdown="\n".join(lines) + "\n", description=title)
+
+    create_table_artifact(
+        key=f"{key}-data",
+        table=_records(sample_rows(df, sample_size)),
+        description=f"{title}: sample of {min(sample_size, len(df))} of {len(df)} rows",
+    )
+
+    if paged:
+        publish_table_pages(df, key, title)
+
+    create_link_artifact(
+        key=f"{key}-full",
+        link=Path(full_path).as_uri(),
+        link_text=os.path.basename(full_path),
+        description=f"{title}: full data ({len(df)} rows)",
+    )
+
+    return full_path
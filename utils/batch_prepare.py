@@ -3,6 +3,8 @@ import json
 from datetime import datetime
 from pathlib import Path
 
+from utils import batch_queue
+
 BASE_DIR = r"C:\DATA_PIPELINE"
 INPUT_DIR = os.path.join(BASE_DIR, "1_input")
 PRE_DIR = os.path.join(BASE_DIR, "2_preprocessing")
@@ -12,7 +14,8 @@ HOT_DIR = os.path.join(BASE_DIR, "3_processing_hotfolder")
 def create_batch_manifest():
     """
     Prepares the batch (partners, units, forex merged files),
-    then generates a _MANIFEST.json file containing all required metadata.
+    then generates a _MANIFEST.json file containing all required metadata
+    and enqueues the batch for processing (see utils.batch_queue).
     """
 
     # Step 1: Create batch ID
@@ -57,4 +60,7 @@ def create_batch_manifest():
     with open(manifest_path, "w", encoding="utf-8") as f:
         json.dump(manifest, f, indent=4)
 
+    # Step 5: Enqueue the batch once its manifest is complete
+    batch_queue.enqueue(batch_id, manifest_path)
+
     return manifest_path
@@ -0,0 +1,234 @@
+import os
+import sqlite3
+import time
+
+QUEUE_PATH = os.path.join(r"C:\DATA_PIPELINE", "batch_queue.sqlite3")
+
+# Batch states: enqueued by create_batch_manifest, claimed by one processor, then finished
+READY = "READY"
+PROCESSING = "PROCESSING"
+DONE = "DONE"
+FAILED = "FAILED"
+
+# A claim older than this is assumed to belong to a crashed processor (see requeue_stale)
+STALE_CLAIM_SECONDS = 2 * 3600
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS batch_queue (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            batch_id TEXT NOT NULL UNIQUE,
+            manifest_path TEXT NOT NULL,
+            status TEXT NOT NULL,
+            enqueued_at REAL NOT NULL,
+            claimed_at REAL,
+            finished_at REAL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT
+        )
+        """
+    )
+    # "Next batch" is a single index seek instead of a scan of the hotfolder
+    conn.execute("CREATE INDEX IF NOT EXISTS batch_queue_status ON batch_queue (status, batch_id)")
+    # One-time steps already done on this queue (e.g. importing the existing hotfolder)
+    conn.execute("CREATE TABLE IF NOT EXISTS batch_queue_markers (name TEXT PRIMARY KEY, set_at REAL NOT NULL)")
+    return conn
+
+
+def enqueue(batch_id, manifest_path, path=QUEUE_PATH):
+    """
+    Adds a batch to the queue as READY. A batch that is already queued is left as it is.
+
+    Args:
+        batch_id: Batch ID (YYYYMMDDHHMMSS), which is also the processing order.
+        manifest_path: Path of the batch's _MANIFEST.json file.
+        path: Location of the SQLite queue file.
+
+    Returns:
+        True if the batch was added, False if it was already queued.
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO batch_queue (batch_id, manifest_path, status, enqueued_at) "
+                "VALUES (?, ?, ?, ?)",
+                (str(batch_id), str(manifest_path), READY, time.time()),
+            )
+            return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def claim_next(path=QUEUE_PATH):
+    """
+    Atomically claims the oldest READY batch by marking it PROCESSING. Concurrent
+    processors never receive the same batch.
+
+    Args:
+        path: Location of the SQLite queue file.
+
+    Returns:
+        Tuple of (batch_id, manifest_path), or None if no batch is ready.
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            # Take the write lock before reading, so the select and update are one step
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT batch_id, manifest_path FROM batch_queue WHERE status = ? ORDER BY batch_id LIMIT 1",
+                (READY,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE batch_queue SET status = ?, claimed_at = ?, attempts = attempts + 1 WHERE batch_id = ?",
+                (PROCESSING, time.time(), row[0]),
+            )
+            return row[0], row[1]
+    finally:
+        conn.close()
+
+
+def claim(batch_id, path=QUEUE_PATH):
+    """
+    Atomically claims a specific batch (e.g. the one named by a manifest event).
+
+    Returns:
+        True if the batch was READY and is now PROCESSING for the caller, False if it
+        is unknown or was already claimed or finished by another processor.
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            cursor = conn.execute(
+                "UPDATE batch_queue SET status = ?, claimed_at = ?, attempts = attempts + 1 "
+                "WHERE batch_id = ? AND status = ?",
+                (PROCESSING, time.time(), str(batch_id), READY),
+            )
+            return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def _finish(batch_id, status, error, path):
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute(
+                "UPDATE batch_queue SET status = ?, finished_at = ?, error = ? WHERE batch_id = ?",
+                (status, time.time(), error, str(batch_id)),
+            )
+    finally:
+        conn.close()
+
+
+def mark_done(batch_id, path=QUEUE_PATH):
+    """Marks a claimed batch as DONE"""
+    _finish(batch_id, DONE, None, path)
+
+
+def mark_failed(batch_id, error, path=QUEUE_PATH):
+    """Marks a claimed batch as FAILED, keeping the error message"""
+    _finish(batch_id, FAILED, str(error), path)
+
+
+def batch_status(batch_id, path=QUEUE_PATH):
+    """Returns the state of a batch, or None if it is not in the queue"""
+    conn = _connect(path)
+    try:
+        row = conn.execute("SELECT status FROM batch_queue WHERE batch_id = ?", (str(batch_id),)).fetchone()
+    finally:
+        conn.close()
+    return row[0] if row else None
+
+
+def requeue_stale(stale_after=STALE_CLAIM_SECONDS, path=QUEUE_PATH):
+    """
+    Returns batches claimed more than stale_after seconds ago, whose processor
+    presumably crashed, to READY so they are picked up again.
+
+    Returns:
+        List of requeued batch IDs
+    """
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            batch_ids = [row[0] for row in conn.execute(
+                "SELECT batch_id FROM batch_queue WHERE status = ? AND claimed_at < ?",
+                (PROCESSING, time.time() - stale_after),
+            )]
+            conn.executemany(
+                "UPDATE batch_queue SET status = ?, claimed_at = NULL WHERE batch_id = ?",
+                [(READY, batch_id) for batch_id in batch_ids],
+            )
+    finally:
+        conn.close()
+
+    for batch_id in batch_ids:
+        print(f"Warning: Requeued stale batch {batch_id}")
+    return batch_ids
+
+
+def enqueued_since(seq, status=READY, path=QUEUE_PATH):
+    """
+    Lists the batches enqueued after a given sequence number, e.g. for a watcher
+    that announces each new batch once.
+
+    Args:
+        seq: Last sequence number already seen (0 for all batches).
+        status: Only return batches in this state (None for any state).
+        path: Location of the SQLite queue file.
+
+    Returns:
+        List of (seq, batch_id, manifest_path) tuples in enqueue order
+    """
+    query = "SELECT seq, batch_id, manifest_path FROM batch_queue WHERE seq > ?"
+    params = [seq]
+    if status is not None:
+        query += " AND status = ?"
+        params.append(status)
+
+    conn = _connect(path)
+    try:
+        return conn.execute(query + " ORDER BY seq", params).fetchall()
+    finally:
+        conn.close()
+
+
+def has_marker(name, path=QUEUE_PATH):
+    """Whether the one-time step called name has been recorded as done"""
+    conn = _connect(path)
+    try:
+        return conn.execute("SELECT 1 FROM batch_queue_markers WHERE name = ?", (name,)).fetchone() is not None
+    finally:
+        conn.close()
+
+
+def set_marker(name, path=QUEUE_PATH):
+    """Records the one-time step called name as done"""
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO batch_queue_markers (name, set_at) VALUES (?, ?)", (name, time.time()))
+    finally:
+        conn.close()
+
+
+def status_counts(path=QUEUE_PATH):
+    """
+    Returns:
+        Dict mapping each batch state to its number of batches
+    """
+    conn = _connect(path)
+    try:
+        counts = dict(conn.execute("SELECT status, COUNT(*) FROM batch_queue GROUP BY status").fetchall())
+    finally:
+        conn.close()
+    return {status: counts.get(status, 0) for status in (READY, PROCESSING, DONE, FAILED)}
@@ -1,15 +1,24 @@
 import json
 import os
 import shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 
+from utils import batch_queue
+from utils.batch_prepare import HOT_DIR
+
 
 BASE_DIR = r"C:\DATA_PIPELINE"
 ARCHIVE_DIR = os.path.join(BASE_DIR, "4_archive")
 ERROR_DIR = os.path.join(BASE_DIR, "5_error")
 LOG_DIR = os.path.join(BASE_DIR, "6_logs")
 
+READY_STATUS = "READY_FOR_PROCESSING"
+
+# Batches processed at the same time when draining the batch queue
+DRAIN_MAX_WORKERS = os.cpu_count() or 4
+
 
 def load_manifest(manifest_file):
     with open(manifest_file, "r", encoding="utf-8") as f:
@@ -37,6 +46,7 @@ def run_core_processing(manifest_file: str):
         # TODO — insert your real processing logic here
         # Example:
         # processed_df = transform_data(partners, units, forex, raw_files)
+        # processed_df["amount_usd"] = convert_amounts(processed_df, "USD")  # utils.currency_converter
         # processed_df.to_csv(...)
 
         # Fake output to show structure:
@@ -77,3 +87,117 @@ def run_core_processing(manifest_file: str):
             log.write(str(e))
 
         raise
+
+
+def find_ready_manifests(hot_dir=HOT_DIR):
+    """
+    Lists the manifests in the hotfolder whose status is READY_FOR_PROCESSING,
+    oldest batch first. Manifests that cannot be read (e.g. still being written)
+    are skipped and picked up by a later run.
+
+    Returns:
+        List of manifest file paths
+    """
+    ready = []
+    for path in Path(hot_dir).glob("*_MANIFEST.json"):
+        try:
+            manifest = load_manifest(path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Skipping unreadable manifest {path}: {e}")
+            continue
+        if manifest.get("status") == READY_STATUS:
+            ready.append((str(manifest.get("batch_id", "")), str(path)))
+
+    # Batch IDs are creation timestamps (YYYYMMDDHHMMSS), so they sort chronologically
+    return [path for _, path in sorted(ready)]
+
+
+def enqueue_ready_manifests(hot_dir=HOT_DIR, queue_path=batch_queue.QUEUE_PATH):
+    """
+    Enqueues the ready manifests found in the hotfolder that are not yet in the batch
+    queue, e.g. manifests written before the queue existed or copied in by hand.
+    This scans the hotfolder, so it is only run on request.
+
+    Returns:
+        List of newly enqueued manifest paths
+    """
+    added = []
+    for path in find_ready_manifests(hot_dir):
+        batch_id = load_manifest(path)["batch_id"]
+        if batch_queue.enqueue(batch_id, path, queue_path):
+            added.append(path)
+    return added
+
+
+def import_hotfolder_once(hot_dir=HOT_DIR, queue_path=batch_queue.QUEUE_PATH):
+    """
+    Enqueues the ready manifests already in the hotfolder the first time a queue is
+    used, so batches prepared before the queue existed are not left behind. Later
+    calls only check a marker in the queue.
+
+    Returns:
+        List of newly enqueued manifest paths
+    """
+    if batch_queue.has_marker("hotfolder_imported", queue_path):
+        return []
+    added = enqueue_ready_manifests(hot_dir, queue_path)
+    batch_queue.set_marker("hotfolder_imported", queue_path)
+    return added
+
+
+def process_batch(batch_id, manifest_file, queue_path=batch_queue.QUEUE_PATH):
+    """
+    Runs run_core_processing for a batch claimed from the queue and records the
+    outcome: DONE, or FAILED with the error (the error is raised again).
+    """
+    try:
+        run_core_processing(manifest_file)
+    except Exception as e:
+        batch_queue.mark_failed(batch_id, e, queue_path)
+        raise
+    batch_queue.mark_done(batch_id, queue_path)
+
+
+def drain_queue(max_workers=DRAIN_MAX_WORKERS, use_processes=False, queue_path=batch_queue.QUEUE_PATH):
+    """
+    Processes ready batches from the queue concurrently until none is left. A batch
+    is claimed only when a worker is free, so several processors can drain the same
+    queue; a failing batch (moved to the error folder by run_core_processing) does
+    not stop the others.
+
+    Args:
+        max_workers: Maximum number of batches processed at the same time
+        use_processes: Use a process pool (for CPU-bound processing) instead of threads
+        queue_path: Location of the SQLite queue file
+
+    Returns:
+        Tuple of (list of processed manifest paths, dict mapping each failed
+        manifest path to its error message)
+    """
+    processed = []
+    failed = {}
+    max_workers = max(1, max_workers)
+
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=max_workers) as pool:
+        running = {}
+        while True:
+            while len(running) < max_workers:
+                batch = batch_queue.claim_next(queue_path)
+                if batch is None:
+                    break
+                running[pool.submit(process_batch, *batch, queue_path)] = batch[1]
+
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                manifest_file = running.pop(future)
+                try:
+                    future.result()
+                    processed.append(manifest_file)
+                except Exception as e:
+                    failed[manifest_file] = str(e)
+
+    return processed, failed
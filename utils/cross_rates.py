@@ -0,0 +1,143 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from utils import fx_store
+
+# Per-month cross-rate matrices, stored as memory-mappable files: cross_rates/YYYY_MM.cross.npy
+# holds two consecutive .npy arrays, the N currency codes (row/column order) followed by an
+# N x N float64 matrix where matrix[i, j] is the number of units of currency j per unit of
+# currency i. Keeping both in one file means a reader can never pair a matrix with the
+# codes of another build
+CROSS_RATE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "cross_rates")
+
+BASE_CURRENCY = 'USD'
+
+# Matrices mapped by this process so far; the pages themselves are shared by the OS
+_mapped = {}
+_mapped_lock = threading.Lock()
+
+
+def _path(year_month, cross_rate_dir):
+    return os.path.join(cross_rate_dir, f"{year_month // 100:04d}_{year_month % 100:02d}.cross.npy")
+
+
+def build_cross_rates(year_month, cross_rate_dir=CROSS_RATE_DIR):
+    """
+    Precomputes the cross-rate matrix of one month from its USD rates in the FX store.
+
+    Args:
+        year_month: Month as integer YYYYMM
+
+    Returns:
+        Number of currencies in the matrix
+    """
+    df = fx_store.read_range(year_month, year_month, columns=['Currency', 'Exchange_Rate'])
+    df = df.dropna().astype({'Currency': object}).drop_duplicates('Currency')
+
+    usd_rates = dict(zip(df['Currency'], df['Exchange_Rate']))
+    usd_rates.setdefault(BASE_CURRENCY, 1.0)
+
+    currencies = sorted(usd_rates)
+    rates = np.array([usd_rates[c] for c in currencies], dtype=np.float64)
+
+    path = _path(year_month, cross_rate_dir)
+    os.makedirs(cross_rate_dir, exist_ok=True)
+
+    # Write to a temporary file and rename, so the codes and matrix are published together.
+    # Codes are 8-byte strings, which keeps the matrix data 8-byte aligned for mapping
+    fd, tmp_path = tempfile.mkstemp(dir=cross_rate_dir, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.lib.format.write_array(f, np.array(currencies, dtype='S8'))
+            np.lib.format.write_array(f, rates[:, None] / rates[None, :])
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    with _mapped_lock:
+        _mapped.pop(year_month, None)
+
+    return len(currencies)
+
+
+def build_missing_cross_rates(cross_rate_dir=CROSS_RATE_DIR):
+    """
+    Builds the cross-rate matrix of every stored month that has none yet, or whose
+    FX store partition changed since the matrix was built.
+
+    Returns:
+        List of the YYYYMM months that were (re)built
+    """
+    built = []
+    for year_month in fx_store.stored_months():
+        path = _path(year_month, cross_rate_dir)
+        if os.path.exists(path) and \
+                os.path.getmtime(path) >= os.path.getmtime(fx_store.partition_path(year_month)):
+            continue
+        build_cross_rates(year_month, cross_rate_dir)
+        built.append(year_month)
+    return built
+
+
+def load_cross_rates(year_month, cross_rate_dir=CROSS_RATE_DIR):
+    """
+    Memory-maps the cross-rate matrix of a month (read-only, without parsing).
+
+    Args:
+        year_month: Month as integer YYYYMM
+
+    Returns:
+        Tuple (index, matrix): dict of currency code -> position, and the N x N
+        memory-mapped matrix. None if no matrix has been built for the month.
+    """
+    with _mapped_lock:
+        if year_month in _mapped:
+            return _mapped[year_month]
+
+    path = _path(year_month, cross_rate_dir)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "rb") as f:
+        codes = np.lib.format.read_array(f)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+
+    if shape != (len(codes), len(codes)) or fortran_order:
+        raise ValueError(f"Cross-rate file {path} is malformed")
+    index = {code.decode('ascii'): i for i, code in enumerate(codes)}
+    matrix = np.memmap(path, dtype=dtype, mode='r', shape=shape, offset=offset)
+
+    with _mapped_lock:
+        _mapped[year_month] = (index, matrix)
+    return index, matrix
+
+
+def get_cross_rate(source_currency, target_currency, year_month, cross_rate_dir=CROSS_RATE_DIR):
+    """
+    Looks up how many units of target_currency one unit of source_currency buys in a month.
+
+    Args:
+        source_currency: Currency code converted from, e.g. 'EUR'
+        target_currency: Currency code converted to, e.g. 'CHF'
+        year_month: Month as integer YYYYMM
+
+    Returns:
+        The cross rate as float, or None if the month or a currency is not available
+    """
+    loaded = load_cross_rates(year_month, cross_rate_dir)
+    if loaded is None:
+        return None
+
+    index, matrix = loaded
+    if source_currency not in index or target_currency not in index:
+        return None
+    return float(matrix[index[source_currency], index[target_currency]])
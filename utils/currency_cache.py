@@ -0,0 +1,104 @@
+import os
+import sqlite3
+import time
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "currency_cache.sqlite3")
+
+# Successful lookups rarely change; failed lookups are retried much sooner
+POSITIVE_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
+
+# Least recently used entries are evicted beyond this size
+MAX_ENTRIES = 1000
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS currency_cache (
+            country_code TEXT PRIMARY KEY,
+            currency TEXT,
+            fetched_at REAL NOT NULL,
+            last_used REAL NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def load_currencies(country_codes, path=CACHE_PATH):
+    """
+    Loads the cached currency codes that have not yet expired.
+
+    Args:
+        country_codes: Iterable of 3-letter ISO country codes.
+        path: Location of the SQLite cache file.
+
+    Returns:
+        Dict mapping each fresh country code to its currency code. A value of None
+        means a failed lookup that is still within the negative TTL.
+    """
+    country_codes = list(country_codes)
+    if not country_codes:
+        return {}
+
+    now = time.time()
+    found = {}
+
+    conn = _connect(path)
+    try:
+        with conn:
+            placeholders = ",".join("?" * len(country_codes))
+            rows = conn.execute(
+                f"SELECT country_code, currency, fetched_at FROM currency_cache "
+                f"WHERE country_code IN ({placeholders})",
+                country_codes,
+            ).fetchall()
+
+            for country_code, currency, fetched_at in rows:
+                ttl = POSITIVE_TTL_SECONDS if currency is not None else NEGATIVE_TTL_SECONDS
+                if now - fetched_at < ttl:
+                    found[country_code] = currency
+
+            if found:
+                conn.executemany(
+                    "UPDATE currency_cache SET last_used = ? WHERE country_code = ?",
+                    [(now, country_code) for country_code in found],
+                )
+    finally:
+        conn.close()
+
+    return found
+
+
+def store_currencies(currencies, path=CACHE_PATH):
+    """
+    Stores resolved currency codes and evicts the least recently used entries
+    once the cache grows beyond MAX_ENTRIES.
+
+    Args:
+        currencies: Dict mapping country codes to currency codes (None for failures).
+        path: Location of the SQLite cache file.
+    """
+    if not currencies:
+        return
+
+    now = time.time()
+
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO currency_cache (country_code, currency, fetched_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(country_code, currency, now, now) for country_code, currency in currencies.items()],
+            )
+            conn.execute(
+                "DELETE FROM currency_cache WHERE country_code NOT IN ("
+                "SELECT country_code FROM currency_cache ORDER BY last_used DESC LIMIT ?)",
+                (MAX_ENTRIES,),
+            )
+    finally:
+        conn.close()
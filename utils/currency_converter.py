@@ -0,0 +1,154 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from utils import fx_store
+
+# Rates are quoted in USD per unit of the local currency, so any pair converts
+# through USD: target_amount = amount * rate[source] / rate[target]
+BASE_CURRENCY = 'USD'
+
+# Rows converted per vectorized pass; bounds the size of temporary arrays
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# months: sorted int64 YYYYMM array; currencies: pd.Index of currency codes;
+# matrix: float64 array of shape (len(months), len(currencies))
+RateTable = namedtuple('RateTable', ['months', 'currencies', 'matrix'])
+
+
+def load_rate_table(start_month=0, end_month=999912):
+    """
+    Loads the USD rates of every currency and month from the FX store into a dense
+    month x currency matrix. Missing rates are carried forward from the previous
+    month, so a lookup always gets the latest rate as of that month.
+
+    Args:
+        start_month: First month as integer YYYYMM (defaults to the earliest stored)
+        end_month: Last month as integer YYYYMM (defaults to the latest stored)
+
+    Returns:
+        RateTable
+    """
+    df = fx_store.read_range(start_month, end_month, columns=['Currency', 'Date', 'Exchange_Rate'])
+    df = df.dropna(subset=['Currency']).astype({'Currency': object})
+
+    # Several countries can share a currency (e.g. EUR); keep one rate per month
+    matrix = (
+        df.drop_duplicates(['Date', 'Currency'])
+        .pivot(index='Date', columns='Currency', values='Exchange_Rate')
+        .sort_index()
+        .ffill()
+    )
+    matrix[BASE_CURRENCY] = 1.0
+
+    return RateTable(
+        months=matrix.index.to_numpy(dtype=np.int64),
+        currencies=pd.Index(matrix.columns),
+        matrix=matrix.to_numpy(dtype=np.float64),
+    )
+
+
+def _to_year_month(dates):
+    """
+    Convert a date column (YYYYMM numbers or strings, other date strings or datetimes)
+    to integer YYYYMM. Missing dates become -1, which is before every stored month.
+    """
+    if pd.api.types.is_numeric_dtype(dates) and not pd.api.types.is_bool_dtype(dates):
+        # Float when read_csv met a blank date
+        return dates.fillna(-1).to_numpy(dtype=np.int64)
+
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        text = dates.astype('string').str.strip()
+        if text.str.fullmatch(r"\d{6}").fillna(True).all():
+            dates = pd.to_datetime(text, format='%Y%m')
+        else:
+            dates = pd.to_datetime(dates)
+
+    return (dates.dt.year * 100 + dates.dt.month).fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _convert_chunk(amounts, currencies, year_months, target_index, rates):
+    # As-of join: the latest stored month at or before each row's month
+    month_index = np.searchsorted(rates.months, year_months, side='right') - 1
+    currency_index = rates.currencies.get_indexer(currencies)
+
+    valid = (month_index >= 0) & (currency_index >= 0)
+    month_index = np.where(valid, month_index, 0)
+    currency_index = np.where(valid, currency_index, 0)
+
+    source_rate = rates.matrix[month_index, currency_index]
+    target_rate = rates.matrix[month_index, target_index]
+
+    converted = amounts * source_rate / target_rate
+    converted[~valid] = np.nan
+    return converted
+
+
+def convert_amounts(df, target_currency, amount_col='amount', currency_col='currency',
+                    date_col='date', rates=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Converts amounts in mixed currencies to one target currency, using the rate of each
+    row's month (or the latest earlier month available). Cross rates go through USD.
+    Rows with an unknown currency or no rate on or before their month become NaN.
+
+    Args:
+        df: DataFrame with amount, currency and date columns
+        target_currency: Currency code to convert to, e.g. 'EUR'
+        amount_col: Name of the amount column
+        currency_col: Name of the currency code column
+        date_col: Name of the date column (integer YYYYMM, date strings or datetimes)
+        rates: Optional RateTable (loaded from the FX store if not given)
+        chunk_size: Rows converted per vectorized pass
+
+    Returns:
+        float64 NumPy array of converted amounts, aligned with df's rows
+    """
+    if rates is None:
+        rates = load_rate_table()
+
+    target_index = rates.currencies.get_indexer([target_currency])[0]
+    if target_index < 0:
+        raise ValueError(f"No exchange rates found for target currency {target_currency}")
+
+    converted = np.empty(len(df), dtype=np.float64)
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        converted[start:start + len(chunk)] = _convert_chunk(
+            chunk[amount_col].to_numpy(dtype=np.float64),
+            chunk[currency_col],
+            _to_year_month(chunk[date_col]),
+            target_index,
+            rates,
+        )
+    return converted
+
+
+def convert_csv(input_path, output_path, target_currency, amount_col='amount', currency_col='currency',
+                date_col='date', output_col=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Converts a CSV file too large for memory chunk by chunk, appending a column with
+    the converted amounts. The rate table is loaded once for all chunks.
+
+    Args:
+        input_path: CSV file with amount, currency and date columns
+        output_path: Where to write the CSV file with the converted column
+        target_currency: Currency code to convert to, e.g. 'EUR'
+        output_col: Name of the converted column (defaults to '<amount_col>_<target_currency>')
+        chunk_size: Rows read and converted per chunk
+
+    Returns:
+        Number of rows converted
+    """
+    rates = load_rate_table()
+    output_col = output_col or f"{amount_col}_{target_currency}"
+
+    rows = 0
+    for i, chunk in enumerate(pd.read_csv(input_path, chunksize=chunk_size)):
+        chunk[output_col] = convert_amounts(
+            chunk, target_currency, amount_col, currency_col, date_col, rates=rates, chunk_size=chunk_size
+        )
+        chunk.to_csv(output_path, mode='w' if i == 0 else 'a', header=(i == 0), index=False,
+                     encoding='utf-8-sig' if i == 0 else 'utf-8')
+        rows += len(chunk)
+    return rows
@@ -1,14 +1,31 @@
-import os
+import asyncio
+import contextlib
+import io
 import json
-import urllib.request
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+import urllib.parse
 import xml.etree.ElementTree as ET
+import zlib
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
+from array import array
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+from utils import fx_store, http_client, raw_response_cache
+from utils.currency_cache import load_currencies, store_currencies
+from utils.file_lock import file_lock, file_locks
+
 BASE_DIR = os.path.join(os.path.dirname(__file__), "..", "data")
 
-# Global cache for country currency codes
+# In-process cache for country currency codes, backed by the persistent
+# on-disk cache in utils.currency_cache
 currency_cache = {}
 
 # Hardcoded overrides for specific country/region codes
@@ -18,11 +35,61 @@ SPECIAL_CURRENCY_OVERRIDES = {
     'G163': 'EUR'  # G163 Group, Actually Eurozone
 }
 
+# Concurrency settings for currency resolution
+RESOLVE_MAX_WORKERS = 8             # Maximum lookups in flight at the same time
+RESOLVE_CHUNK_SIZE = 50             # Country codes per multi-code request
+RESOLVE_MIN_INTERVAL_SECONDS = 0.1  # Minimum spacing between requests to the same host
+
+# IMF SDMX exchange rate dataflow; the default key selects the monthly
+# period-average USD rates (USD per unit of local currency) of all countries
+IMF_DATA_URL = "https://api.imf.org/external/sdmx/2.1/data"
+IMF_FLOW_REF = 'IMF.STA,ER'
+IMF_MONTHLY_USD_KEY = '.USD_XDC.PA_RT.M'
+
+# Response representations of the IMF SDMX API, selected with the Accept header.
+# SDMX-CSV carries one flat row per observation and parses several times faster than
+# SDMX-ML, but is not smaller on the wire, raw or gzipped (see benchmark_sdmx_formats.py);
+# None keeps the API's default SDMX-ML (XML) representation.
+SDMX_MEDIA_TYPES = {
+    'xml': None,
+    'csv': 'application/vnd.sdmx.data+csv;version=1.0.0',
+}
+
+# SDMX-CSV columns read by parse_sdmx_csv; the series key dimensions come first
+SDMX_CSV_SERIES_COLUMNS = ['COUNTRY', 'INDICATOR', 'TYPE_OF_TRANSFORMATION', 'FREQUENCY']
+
+# Overall time budget for one IMF request, including retries
+IMF_DEADLINE_SECONDS = 120
+
+# Concurrent IMF queries of fetch_months_async
+ASYNC_MAX_CONCURRENCY = 4
+
+# Bytes read at a time when stream-parsing an XML payload
+XML_READ_CHUNK_SIZE = 64 * 1024
+
+# Backfill settings
+BACKFILL_WINDOW_MONTHS = 12     # Months requested per IMF query
+BACKFILL_MAX_CONCURRENCY = 4    # IMF queries (and parser processes) in flight at the same time
+
+# Records the time of the last successful revision check (see fetch_revisions)
+FETCH_STATE_PATH = os.path.join(BASE_DIR, "fetch_state.json")
+
+# Monthly output files written to BASE_DIR, e.g. exchange_rates_2025_11.csv
+MONTHLY_FILE_PATTERN = re.compile(r"^exchange_rates_(\d{4})_(\d{2})\.csv$")
+
+# Appended to a monthly file path to get its single-flight lock file
+LOCK_SUFFIX = ".lock"
+
+# Per-host rate limiting state
+_host_next_slot = {}
+_host_slots_lock = threading.Lock()
+
 
 def get_official_currency(country_code):
     """
     Fetches the official currency code for a given country using the REST Countries API.
-    Uses a local cache and special overrides to avoid redundant or incorrect API calls.
+    Uses special overrides, the in-process cache and the persistent on-disk cache
+    to avoid redundant or incorrect API calls.
     
     Args:
         country_code: The 3-letter ISO code for the country.
@@ -38,124 +105,870 @@ def get_official_currency(country_code):
     if country_code in currency_cache:
         return currency_cache[country_code]
 
+    cached = load_currencies([country_code])
+    if country_code in cached:
+        currency_cache[country_code] = cached[country_code]
+        return cached[country_code]
+
     try:
         url = f"https://restcountries.com/v3.1/alpha/{country_code}"
-        req = urllib.request.Request(url, headers={'User-Agent': 'Python-Currency-App/1.0'})
-        with urllib.request.urlopen(req, timeout=5) as response:
-            if response.getcode() == 200:
-                data = json.loads(response.read().decode("utf-8"))
-                if data and 'currencies' in data[0]:
-                    # Get the first currency code from the currencies object
-                    currency_code_3_letter = list(data[0]['currencies'].keys())[0]
-                    # Store in cache
-                    currency_cache[country_code] = currency_code_3_letter
-                    return currency_code_3_letter
+        _wait_for_host_slot(url)
+        response = http_client.request('GET', url, timeout=5, deadline=30)
+        if response.status_code == 200:
+            data = response.json()
+            if data and 'currencies' in data[0]:
+                # Get the first currency code from the currencies object
+                currency_code_3_letter = list(data[0]['currencies'].keys())[0]
+                # Store in cache
+                currency_cache[country_code] = currency_code_3_letter
+                store_currencies({country_code: currency_code_3_letter})
+                return currency_code_3_letter
     except Exception as e:
         print(f"Warning: Could not fetch currency for {country_code}. Error: {e}")
     
-    # Cache the failure to avoid retrying
+    # Cache the failure to avoid retrying until the negative TTL expires
     currency_cache[country_code] = None
+    store_currencies({country_code: None})
     return None
 
 
-def get_currency_data_from_imf(start_date, end_date):
+def _reserve_host_slot(url):
+    """Reserves the next request slot of the URL's host and returns the seconds to wait for it."""
+    host = urllib.parse.urlsplit(url).netloc
+    with _host_slots_lock:
+        now = time.monotonic()
+        slot = max(now, _host_next_slot.get(host, now))
+        _host_next_slot[host] = slot + RESOLVE_MIN_INTERVAL_SECONDS
+    return slot - now
+
+
+def _wait_for_host_slot(url):
+    """Blocks until the per-host rate limit allows another request to the URL's host."""
+    delay = _reserve_host_slot(url)
+    if delay > 0:
+        time.sleep(delay)
+
+
+def _fetch_currency_chunk(country_codes):
+    """
+    Looks up a chunk of country codes with one multi-code REST Countries request.
+
+    Args:
+        country_codes: List of 3-letter ISO country codes.
+
+    Returns:
+        Dict mapping each country code in the chunk to its currency code (or None if
+        the API did not return a currency for it).
+    """
+    url = _currency_chunk_url(country_codes)
+    _wait_for_host_slot(url)
+    response = http_client.request('GET', url, timeout=10, deadline=60)
+    response.raise_for_status()
+    return _currencies_from_response(country_codes, response.json())
+
+
+def _currency_chunk_url(country_codes):
+    codes = ",".join(sorted(country_codes))
+    return f"https://restcountries.com/v3.1/alpha?codes={codes}&fields=cca2,cca3,cioc,currencies"
+
+
+def _currencies_from_response(country_codes, data):
+    """
+    Maps each country code of a chunk to the first currency of its REST Countries entry (or None).
+    The API matches a code against cca2, cca3 and cioc (e.g. IMF's KOS is Kosovo's cioc code,
+    its cca3 is UNK), so entries are matched back the same way.
+    """
+    fetched = {}
+    # An ISO alpha-3 match wins over another country's IOC or alpha-2 code
+    for field in ('cca3', 'cioc', 'cca2'):
+        for entry in data:
+            code = entry.get(field)
+            currencies = entry.get('currencies')
+            if code in country_codes and code not in fetched and currencies:
+                # Get the first currency code from the currencies object
+                fetched[code] = list(currencies.keys())[0]
+
+    for country_code in country_codes:
+        if country_code not in fetched:
+            print(f"Warning: Could not find currency for {country_code}.")
+            fetched[country_code] = None
+
+    return fetched
+
+
+def _split_cached_currencies(country_codes):
+    """
+    Serves country codes from the overrides and the in-process cache.
+
+    Returns:
+        Tuple of (dict of resolved codes, list of codes still to look up)
+    """
+    resolved = {}
+    pending = []
+
+    for country_code in set(country_codes):
+        if country_code in SPECIAL_CURRENCY_OVERRIDES:
+            resolved[country_code] = SPECIAL_CURRENCY_OVERRIDES[country_code]
+        elif country_code in currency_cache:
+            resolved[country_code] = currency_cache[country_code]
+        else:
+            pending.append(country_code)
+    return resolved, pending
+
+
+def _load_cached_currencies(resolved, pending):
+    """Serves pending country codes from the persistent cache and returns the codes still missing"""
+    if not pending:
+        return pending
+    cached = load_currencies(pending)
+    currency_cache.update(cached)
+    resolved.update(cached)
+    return [country_code for country_code in pending if country_code not in cached]
+
+
+def _chunk_codes(pending):
+    pending = sorted(pending)
+    return [
+        pending[i:i + RESOLVE_CHUNK_SIZE]
+        for i in range(0, len(pending), RESOLVE_CHUNK_SIZE)
+    ]
+
+
+def _remember_currencies(resolved, fetched):
+    currency_cache.update(fetched)
+    store_currencies(fetched)
+    resolved.update(fetched)
+
+
+def resolve_currencies(country_codes, max_workers=RESOLVE_MAX_WORKERS):
+    """
+    Resolves the official currency codes for a set of countries in batched lookups.
+    Overrides and codes found in the in-process or persistent cache are served locally;
+    the remaining codes are split into multi-code REST Countries requests that run
+    concurrently. Chunks whose batched request fails fall back to concurrent
+    per-country lookups via get_official_currency.
+
+    Args:
+        country_codes: Iterable of 3-letter ISO country codes.
+        max_workers: Maximum number of lookups in flight at the same time.
+
+    Returns:
+        Dict mapping each country code to its currency code (or None if not found).
+    """
+    resolved, pending = _split_cached_currencies(country_codes)
+    pending = _load_cached_currencies(resolved, pending)
+    if not pending:
+        return resolved
+
+    fetched = {}
+    failed = []
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        futures = {pool.submit(_fetch_currency_chunk, chunk): chunk for chunk in _chunk_codes(pending)}
+        for future in as_completed(futures):
+            try:
+                fetched.update(future.result())
+            except Exception as e:
+                print(f"Warning: Batched currency lookup failed, falling back to per-country lookups. Error: {e}")
+                failed.extend(futures[future])
+
+        # Failed chunks are retried per country; get_official_currency caches its own results
+        for country_code, currency in zip(failed, pool.map(get_official_currency, failed)):
+            resolved[country_code] = currency
+
+    # Failures are cached too, to avoid retrying until the negative TTL expires
+    _remember_currencies(resolved, fetched)
+
+    return resolved
+
+
+async def _fetch_currency_chunk_async(country_codes, semaphore):
+    """Async counterpart of _fetch_currency_chunk, using the shared async HTTP client"""
+    url = _currency_chunk_url(country_codes)
+    async with semaphore:
+        await asyncio.sleep(max(0, _reserve_host_slot(url)))
+        response = await http_client.async_request('GET', url, timeout=10, deadline=60)
+    response.raise_for_status()
+    return _currencies_from_response(country_codes, response.json())
+
+
+async def resolve_currencies_async(country_codes, max_workers=RESOLVE_MAX_WORKERS):
+    """
+    Async counterpart of resolve_currencies: the multi-code REST Countries requests run
+    concurrently on the event loop, and the on-disk cache is read and written in a
+    worker thread. Chunks whose batched request fails fall back to per-country lookups.
+
+    Args:
+        country_codes: Iterable of 3-letter ISO country codes.
+        max_workers: Maximum number of lookups in flight at the same time.
+
+    Returns:
+        Dict mapping each country code to its currency code (or None if not found).
+    """
+    resolved, pending = _split_cached_currencies(country_codes)
+    pending = await asyncio.to_thread(_load_cached_currencies, resolved, pending)
+    if not pending:
+        return resolved
+
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    chunks = _chunk_codes(pending)
+    results = await asyncio.gather(
+        *(_fetch_currency_chunk_async(chunk, semaphore) for chunk in chunks),
+        return_exceptions=True,
+    )
+
+    fetched = {}
+    failed = []
+    for chunk, result in zip(chunks, results):
+        if isinstance(result, Exception):
+            print(f"Warning: Batched currency lookup failed, falling back to per-country lookups. Error: {result}")
+            failed.extend(chunk)
+        else:
+            fetched.update(result)
+
+    # Failed chunks are retried per country; get_official_currency caches its own results
+    for country_code in failed:
+        resolved[country_code] = await asyncio.to_thread(get_official_currency, country_code)
+
+    # Failures are cached too, to avoid retrying until the negative TTL expires
+    await asyncio.to_thread(_remember_currencies, resolved, fetched)
+
+    return resolved
+
+
+def imf_data_url(start_date, end_date, updated_after=None, key=IMF_MONTHLY_USD_KEY):
+    """
+    Build the IMF SDMX data URL, by default for the monthly USD exchange rates of all countries.
+    With updated_after (ISO 8601 timestamp), only series changed since then are requested.
+    The key selects the series as COUNTRY.INDICATOR.TYPE_OF_TRANSFORMATION.FREQUENCY
+    (see utils.sdmx_query for building multi-series keys).
+    """
+    url = f"{IMF_DATA_URL}/{IMF_FLOW_REF}/{key}?startPeriod={start_date}&endPeriod={end_date}&dimensionAtObservation=TIME_PERIOD&detail=dataonly&includeHistory=false"
+    if updated_after:
+        url += f"&updatedAfter={urllib.parse.quote(updated_after)}"
+    return url
+
+
+def _cache_url(url, fmt):
+    """
+    Get the raw response cache key URL of a request. Non-XML representations of the
+    same query are tagged in the URL fragment, which is never sent to the server.
+    """
+    return url if fmt == 'xml' else f"{url}#{fmt}"
+
+
+def _request_headers(entry, fmt):
+    """Build the request headers: revalidation headers for a cached entry, and the Accept header of fmt"""
+    if fmt not in SDMX_MEDIA_TYPES:
+        raise Exception(f"Unsupported SDMX format: {fmt}")
+
+    headers = raw_response_cache.conditional_headers(entry) if entry else {}
+    if SDMX_MEDIA_TYPES[fmt]:
+        headers['Accept'] = SDMX_MEDIA_TYPES[fmt]
+    return headers or None
+
+
+def get_currency_data_from_imf(start_date, end_date, use_cache=True, offline=False, updated_after=None,
+                               key=IMF_MONTHLY_USD_KEY, fmt='xml'):
     """
     Fetches exchange rate data from the IMF API for a specified time range.
+    Raw responses are kept compressed in the content-addressed raw response cache;
+    a cached query is revalidated with ETag/Last-Modified, so unchanged data costs
+    an HTTP 304 instead of a full download.
     
     Args:
         start_date: Start date in format 'YYYY-MM'
         end_date: End date in format 'YYYY-MM'
+        use_cache: Revalidate and store responses in the raw response cache
+        offline: Serve the cached response without contacting the IMF API
+        updated_after: Only request series updated after this ISO 8601 timestamp
+                       (such queries are not cached)
+        key: SDMX series key, defaults to the monthly USD rates of all countries
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
     
     Returns:
-        XML data as string, or None if request failed
+        XML (or SDMX-CSV) data as string, an empty string if the API has no data
+        matching the query (HTTP 404), or None if request failed
     """
-    flowRef = 'IMF.STA,ER'
-    key = '.USD_XDC.PA_RT.M'
+    url = imf_data_url(start_date, end_date, updated_after, key)
+    cache_url = _cache_url(url, fmt)
+    use_cache = use_cache and not updated_after
+    entry = raw_response_cache.load_entry(cache_url) if use_cache or offline else None
+
+    if offline:
+        if entry is None:
+            print(f"No cached IMF response for {start_date} to {end_date}")
+            return None
+        return raw_response_cache.read_body(entry).decode("utf-8")
     
+    headers = _request_headers(entry, fmt)
+
     try:
-        url = f"https://api.imf.org/external/sdmx/2.1/data/{flowRef}/{key}?startPeriod={start_date}&endPeriod={end_date}&dimensionAtObservation=TIME_PERIOD&detail=dataonly&includeHistory=false"
-        
-        hdr = {
-            'Cache-Control': 'no-cache',
-        }
+        # Pooled connection, compressed transfer, retried on 429/5xx within the deadline
+        response = http_client.request('GET', url, headers=headers, timeout=30, deadline=IMF_DEADLINE_SECONDS)
 
-        req = urllib.request.Request(url, headers=hdr, method='GET')
-        response = urllib.request.urlopen(req, timeout=10)
+        if response.status_code == 304 and entry:
+            print("IMF data unchanged since last fetch, using cached response")
+            raw_response_cache.touch_entry(entry)
+            return raw_response_cache.read_body(entry).decode("utf-8")
         
-        if response.getcode() == 200:
-            data = response.read().decode("utf-8")
-            return data
+        if response.status_code == 200:
+            if use_cache:
+                raw_response_cache.store_response(
+                    cache_url,
+                    response.content,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'),
+                )
+            return response.text
+
+        if response.status_code == 404:
+            # SDMX REST APIs answer 404 when no data matches the query
+            print(f"No IMF data found for {start_date} to {end_date}")
+            return ""
+
+        print(f"Error fetching from IMF API: HTTP {response.status_code}")
+        return None
             
     except Exception as e:
         print(f"Error fetching from IMF API: {e}")
         return None
 
 
-def process_xml_to_dataframe(xml_data):
+def _local_name(tag):
+    """Strips the '{namespace}' prefix ElementTree adds to qualified tag names."""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _period_to_year_month(time_period):
+    """
+    Converts an SDMX TIME_PERIOD to an integer YYYYMM: monthly '2025-M11' -> 202511,
+    quarterly '2025-Q3' -> 202509 (last month of the quarter), annual '2025' -> 202512.
+    """
+    if len(time_period) == 4:
+        return int(time_period) * 100 + 12
+    if time_period[5] == 'Q':
+        return int(time_period[:4]) * 100 + int(time_period[6:]) * 3
+    return int(time_period[:4]) * 100 + int(time_period[-2:])
+
+
+def _base_currency(indicator):
+    """Determine the base currency from the indicator, e.g. 'USD_XDC' -> 'USD'"""
+    return 'USD' if indicator == 'USD_XDC' else indicator.split('_')[-1]
+
+
+def _collect_series(events, columns, parents):
+    """Moves the observations of every completed Series from parser events into the column buffers."""
+    dates = columns['Date']
+    rates = columns['Exchange_Rate']
+
+    for event, elem in events:
+        if event == 'start':
+            parents.append(elem)
+            continue
+
+        parents.pop()
+        if _local_name(elem.tag) != 'Series':
+            continue
+
+        indicator = elem.get('INDICATOR')  # e.g., 'USD_XDC'
+        obs_count = 0
+
+        # Get all observations for this country
+        for obs in elem:
+            if _local_name(obs.tag) != 'Obs':
+                continue
+
+            value = obs.get('OBS_VALUE')
+            if value is None:
+                continue
+
+            dates.append(_period_to_year_month(obs.get('TIME_PERIOD')))
+            rates.append(float(value))
+            obs_count += 1
+
+        if obs_count:
+            columns['Country'].append(elem.get('COUNTRY'))
+            columns['Base_Currency'].append(_base_currency(indicator))
+            columns['Indicator'].append(indicator)
+            columns['Transformation'].append(elem.get('TYPE_OF_TRANSFORMATION'))
+            columns['Frequency'].append(elem.get('FREQUENCY'))
+            columns['Obs_Count'].append(obs_count)
+
+        # Drop the processed Series so the tree never holds more than one of them
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def parse_sdmx_chunks(chunks):
+    """
+    Incrementally parses SDMX-ML exchange rate data, fed as a stream of bytes chunks
+    (e.g. straight from an HTTP response), into typed column buffers.
+    Each Series element is discarded as soon as its observations have been read,
+    so memory use does not grow with the size of the payload beyond the columns.
+
+    Series-level attributes are stored once per Series together with its number of
+    observations; observation values go into compact typed arrays.
+
+    Args:
+        chunks: Iterable of bytes chunks making up the XML payload
+
+    Returns:
+        Dict with per-Series lists 'Country', 'Base_Currency', 'Indicator',
+        'Transformation', 'Frequency' and 'Obs_Count', and per-observation arrays
+        'Date' (int YYYYMM) and 'Exchange_Rate' (float64)
+    """
+    columns = {
+        'Country': [],
+        'Base_Currency': [],
+        'Indicator': [],
+        'Transformation': [],
+        'Frequency': [],
+        'Obs_Count': [],
+        'Date': array('q'),
+        'Exchange_Rate': array('d'),
+    }
+    parents = []
+    parser = ET.XMLPullParser(events=('start', 'end'))
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        _collect_series(parser.read_events(), columns, parents)
+
+    parser.close()
+    _collect_series(parser.read_events(), columns, parents)
+
+    return columns
+
+
+def parse_sdmx_xml(source):
+    """
+    Incrementally parses an SDMX-ML file or binary stream into typed column buffers.
+    See parse_sdmx_chunks.
+
+    Args:
+        source: File path or binary file-like object containing the XML payload
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return parse_sdmx_xml(f)
+    return parse_sdmx_chunks(iter(lambda: source.read(XML_READ_CHUNK_SIZE), b''))
+
+
+def parse_sdmx_csv(source):
+    """
+    Parses an SDMX-CSV payload into the same typed column buffers as parse_sdmx_xml.
+    The flat observation rows are read by pandas' C parser in one pass; only the
+    distinct periods and Series are handled in Python.
+
+    Args:
+        source: File path or binary file-like object containing the CSV payload
+
+    Returns:
+        Dict with per-Series lists 'Country', 'Base_Currency', 'Indicator',
+        'Transformation', 'Frequency' and 'Obs_Count', and per-observation arrays
+        'Date' (int YYYYMM) and 'Exchange_Rate' (float64)
+    """
+    rows = pd.read_csv(
+        source,
+        usecols=SDMX_CSV_SERIES_COLUMNS + ['TIME_PERIOD', 'OBS_VALUE'],
+        dtype={name: str for name in SDMX_CSV_SERIES_COLUMNS + ['TIME_PERIOD']} | {'OBS_VALUE': np.float64},
+        # Parse values exactly like float() does for SDMX-ML, not to the nearest few ulps
+        float_precision='round_trip',
+    ).dropna(subset=['OBS_VALUE'])
+
+    # Bring the observations of each Series together, keeping their order
+    series_ids = rows.groupby(SDMX_CSV_SERIES_COLUMNS, sort=False).ngroup().to_numpy()
+    order = np.argsort(series_ids, kind='stable')
+    series_ids = series_ids[order]
+    starts = np.flatnonzero(np.diff(series_ids, prepend=-1))
+
+    period_codes, periods = pd.factorize(rows['TIME_PERIOD'].to_numpy()[order])
+    period_months = np.array([_period_to_year_month(p) for p in periods], dtype=np.int64)
+
+    def series_values(name):
+        return rows[name].to_numpy()[order][starts].tolist()
+
+    indicators = series_values('INDICATOR')
+    return {
+        'Country': series_values('COUNTRY'),
+        'Base_Currency': [_base_currency(indicator) for indicator in indicators],
+        'Indicator': indicators,
+        'Transformation': series_values('TYPE_OF_TRANSFORMATION'),
+        'Frequency': series_values('FREQUENCY'),
+        'Obs_Count': np.diff(starts, append=len(series_ids)).tolist(),
+        'Date': period_months[period_codes],
+        'Exchange_Rate': rows['OBS_VALUE'].to_numpy()[order],
+    }
+
+
+def parse_sdmx(source, fmt='xml'):
+    """
+    Parses an SDMX payload in the given representation into typed column buffers.
+
+    Args:
+        source: File path or binary file-like object containing the payload
+        fmt: 'xml' (SDMX-ML, see parse_sdmx_xml) or 'csv' (SDMX-CSV, see parse_sdmx_csv)
+    """
+    if fmt == 'csv':
+        return parse_sdmx_csv(source)
+    if fmt == 'xml':
+        return parse_sdmx_xml(source)
+    raise Exception(f"Unsupported SDMX format: {fmt}")
+
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only binary stream over an iterable of bytes chunks, e.g. a streamed response"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._pending = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b''
+                return 0
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+
+def _series_categorical(series_values, obs_counts):
+    """Broadcasts one value per Series to a per-observation categorical column."""
+    categorical = pd.Categorical(series_values)
+    return pd.Categorical.from_codes(
+        np.repeat(categorical.codes, obs_counts),
+        categories=categorical.categories,
+    )
+
+
+def columns_to_dataframe(columns, currencies, series_columns=()):
+    """
+    Builds the exchange rate DataFrame from parsed column buffers without any
+    per-row Python work.
+
+    Args:
+        columns: Column buffers as returned by parse_sdmx_xml
+        currencies: Dict mapping country codes to currency codes
+        series_columns: Additional per-Series columns to include, e.g.
+                        ('Indicator', 'Transformation', 'Frequency')
+
+    Returns:
+        Pandas DataFrame sorted by Country and Date, with categorical Country,
+        Currency and Base_Currency columns and an integer YYYYMM Date column
+    """
+    obs_counts = np.asarray(columns['Obs_Count'], dtype=np.int64)
+    countries = columns['Country']
+
+    df = pd.DataFrame({
+        'Country': _series_categorical(countries, obs_counts),
+        'Currency': _series_categorical([currencies.get(c) for c in countries], obs_counts),
+        'Date': np.frombuffer(columns['Date'], dtype=np.int64),
+        'Exchange_Rate': np.frombuffer(columns['Exchange_Rate'], dtype=np.float64),
+        'Base_Currency': _series_categorical(columns['Base_Currency'], obs_counts),
+        # Timestamp of when the data is being processed, broadcast once
+        'Timestamp': datetime.now().isoformat(),
+    })
+    for name in series_columns:
+        df[name] = _series_categorical(columns[name], obs_counts)
+
+    # Sort by Country and Date
+    return df.sort_values(['Country', 'Date'], kind='stable')
+
+
+def process_xml_to_dataframe(xml_data, fmt='xml'):
     """
     Parses XML data and converts it into a Pandas DataFrame.
     
     Args:
-        xml_data: XML string from IMF API
+        xml_data: XML string or bytes from IMF API, or a binary file-like object
+                  (e.g. an open file or HTTP response) to parse as a stream
+        fmt: Representation of the data, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
     
     Returns:
         Pandas DataFrame with processed exchange rate data
     """
+    if isinstance(xml_data, str):
+        xml_data = xml_data.encode("utf-8")
+    source = io.BytesIO(xml_data) if isinstance(xml_data, bytes) else xml_data
+
     try:
-        root = ET.fromstring(xml_data)
+        columns = parse_sdmx(source, fmt)
     except Exception as e:
         print(f"Error parsing XML: {e}")
         return pd.DataFrame()
     
-    # Prepare data list
-    data_list = []
-    
-    # Get the timestamp for when the data is being processed
-    fetch_timestamp = datetime.now().isoformat()
-    
-    # Iterate over all Series nodes
-    for series in root.findall(".//Series"):
-        country_code = series.get('COUNTRY')
-        indicator = series.get('INDICATOR')  # e.g., 'USD_XDC'
-        
-        # Get the country's official currency
-        official_currency = get_official_currency(country_code)
-        
-        # Determine the base currency from the indicator
-        base_currency = 'USD' if indicator == 'USD_XDC' else indicator.split('_')[-1]
+    return _resolve_and_build(columns)
 
-        # Get all observations for this country
-        for obs in series.findall('Obs'):
-            time_period = obs.get('TIME_PERIOD')
-            value = obs.get('OBS_VALUE')
-            
-            if value is None:
-                continue
-            
-            year_month = time_period.replace('-M', '')
-            
-            data_list.append({
-                'Country': country_code,
-                'Currency': official_currency,
-                'Date': year_month,
-                'Exchange_Rate': float(value),
-                'Base_Currency': base_currency,
-                'Timestamp': fetch_timestamp
-            })
-    
-    # Create DataFrame
-    df = pd.DataFrame(data_list)
-    
-    if df.empty:
-        return df
-    
-    # Convert date format, keeping only year and month
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y%m').dt.strftime('%Y%m')
-    
-    # Sort by Country and Date
-    df = df.sort_values(['Country', 'Date'])
-    
-    return df
+
+def _resolve_and_build(columns):
+    """Resolves the currencies of parsed column buffers and builds the DataFrame"""
+    if not columns['Country']:
+        return pd.DataFrame()
+
+    # Resolve every country's official currency in one batched lookup
+    currencies = resolve_currencies(columns['Country'])
+
+    return columns_to_dataframe(columns, currencies)
+
+
+def _archive_and_parse(cache_url, chunks, etag, last_modified, fmt):
+    """Archives a streamed IMF response into the raw response cache while parsing it"""
+    # Closed explicitly, so a parse error discards the partial archive right away
+    # instead of whenever the traceback holding the generator is collected
+    archived = raw_response_cache.archive_chunks(cache_url, chunks, etag=etag, last_modified=last_modified)
+    with contextlib.closing(archived):
+        if fmt == 'xml':
+            return parse_sdmx_chunks(archived)
+        return parse_sdmx(io.BufferedReader(_ChunkStream(archived), XML_READ_CHUNK_SIZE), fmt)
+
+
+def fetch_rates_streaming(start_date, end_date, fmt='xml'):
+    """
+    Fetches exchange rate data from the IMF API and parses it while it downloads.
+    The response is streamed straight into the compressed raw response archive and
+    into the parser in the same pass, so the payload is never held in memory.
+    A cached query is revalidated with ETag/Last-Modified and replayed from the
+    archive on HTTP 304.
+
+    Args:
+        start_date: Start date in format 'YYYY-MM'
+        end_date: End date in format 'YYYY-MM'
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV, faster to parse)
+
+    Returns:
+        Pandas DataFrame with processed exchange rate data (empty if the API has no
+        data for the period), or None if the request failed or the response could
+        not be parsed (e.g. a truncated payload)
+    """
+    url = imf_data_url(start_date, end_date)
+    cache_url = _cache_url(url, fmt)
+    entry = raw_response_cache.load_entry(cache_url)
+    headers = _request_headers(entry, fmt)
+
+    try:
+        with http_client.stream('GET', url, headers=headers, timeout=30, deadline=IMF_DEADLINE_SECONDS) as response:
+            if response.status_code == 304 and entry:
+                print("IMF data unchanged since last fetch, replaying archived response")
+                raw_response_cache.touch_entry(entry)
+                return replay_archived_rates(start_date, end_date, fmt)
+
+            if response.status_code == 404:
+                print(f"No IMF data found for {start_date} to {end_date}")
+                return pd.DataFrame()
+
+            if response.status_code != 200:
+                print(f"Error fetching from IMF API: HTTP {response.status_code}")
+                return None
+
+            columns = _archive_and_parse(
+                cache_url,
+                response.iter_bytes(),
+                response.headers.get('ETag'),
+                response.headers.get('Last-Modified'),
+                fmt,
+            )
+
+    except (ET.ParseError, pd.errors.ParserError) as e:
+        print(f"Error parsing {fmt.upper()}: {e}")
+        # A truncated payload may already be archived; don't replay it on HTTP 304
+        raw_response_cache.remove_entry(cache_url)
+        return None
+    except Exception as e:
+        print(f"Error fetching from IMF API: {e}")
+        return None
+
+    return _resolve_and_build(columns)
+
+
+def replay_archived_rates(start_date, end_date, fmt='xml'):
+    """
+    Re-processes the archived IMF response for a period without contacting the API.
+    The compressed payload is decompressed on the fly while it is parsed.
+
+    Args:
+        start_date: Start date in format 'YYYY-MM'
+        end_date: End date in format 'YYYY-MM'
+        fmt: Representation of the archived response, 'xml' or 'csv'
+
+    Returns:
+        Pandas DataFrame with processed exchange rate data (empty if the archived
+        response has no data), or None if no response for the period has been
+        archived or the archived response cannot be parsed
+    """
+    entry = archived_entry(start_date, end_date, fmt)
+    if entry is None:
+        print(f"No archived IMF response for {start_date} to {end_date}")
+        return None
+
+    try:
+        # A broken archive is dropped, so the next fetch downloads the response again
+        columns = parse_archived(entry, fmt)
+    except (ET.ParseError, pd.errors.ParserError, EOFError, OSError, zlib.error) as e:
+        print(f"Error parsing archived {fmt.upper()} response: {e}")
+        return None
+
+    return _resolve_and_build(columns)
+
+
+def _queued_chunks(chunk_queue):
+    """Yields the chunks an async download puts on a queue, until it puts None (or an exception)"""
+    while True:
+        chunk = chunk_queue.get()
+        if chunk is None:
+            return
+        if isinstance(chunk, BaseException):
+            raise chunk
+        yield chunk
+
+
+def parse_archived(entry, fmt='xml'):
+    """
+    Parse an archived IMF response (a raw response cache entry) into column buffers.
+    An archive that cannot be read or parsed (e.g. a truncated download) is dropped
+    from the raw response cache before the error is raised, so it is not reused.
+    """
+    try:
+        with raw_response_cache.open_body(entry) as payload:
+            return parse_sdmx(payload, fmt)
+    except (ET.ParseError, pd.errors.ParserError, EOFError, OSError, zlib.error):
+        raw_response_cache.remove_entry(entry['url'])
+        raise
+
+
+def archived_entry(start_date, end_date, fmt='xml'):
+    """The raw response cache entry archived for a period, or None"""
+    return raw_response_cache.load_entry(_cache_url(imf_data_url(start_date, end_date), fmt))
+
+
+def archive_rates(start_date, end_date, fmt='xml'):
+    """
+    Downloads the IMF response for a period into the raw response cache without parsing
+    it, so download and parsing can run (and be retried) separately. A cached response
+    is revalidated with ETag/Last-Modified and reused on HTTP 304.
+
+    Args:
+        start_date: Start date in format 'YYYY-MM'
+        end_date: End date in format 'YYYY-MM'
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
+
+    Returns:
+        The raw response cache entry of the payload, or None if the API has no data
+        for the period (HTTP 404)
+    """
+    url = imf_data_url(start_date, end_date)
+    cache_url = _cache_url(url, fmt)
+    entry = raw_response_cache.load_entry(cache_url)
+    headers = _request_headers(entry, fmt)
+
+    with http_client.stream('GET', url, headers=headers, timeout=30, deadline=IMF_DEADLINE_SECONDS) as response:
+        if response.status_code == 304 and entry:
+            print("IMF data unchanged since last fetch, using archived response")
+            return raw_response_cache.touch_entry(entry)
+
+        if response.status_code == 404:
+            print(f"No IMF data found for {start_date} to {end_date}")
+            return None
+
+        if response.status_code != 200:
+            raise Exception(f"Error fetching from IMF API: HTTP {response.status_code}")
+
+        chunks = raw_response_cache.archive_chunks(
+            cache_url,
+            response.iter_bytes(),
+            etag=response.headers.get('ETag'),
+            last_modified=response.headers.get('Last-Modified'),
+        )
+        for _ in chunks:
+            pass
+
+    return raw_response_cache.load_entry(cache_url)
+
+
+async def fetch_rates_async(start_date, end_date, key=IMF_MONTHLY_USD_KEY, fmt='xml'):
+    """
+    Async counterpart of fetch_rates_streaming. The response is downloaded on the event
+    loop through the shared async HTTP client and handed chunk by chunk to a worker
+    thread that archives and parses it, so other downloads, currency lookups and file
+    writes on the same loop carry on meanwhile.
+
+    Args:
+        start_date: Start date in format 'YYYY-MM'
+        end_date: End date in format 'YYYY-MM'
+        key: SDMX series key, defaults to the monthly USD rates of all countries
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
+
+    Returns:
+        Pandas DataFrame with processed exchange rate data (empty if the API has no
+        data for the period), or None if the request failed or the response could
+        not be parsed (e.g. a truncated payload)
+    """
+    url = imf_data_url(start_date, end_date, key=key)
+    cache_url = _cache_url(url, fmt)
+    entry = await asyncio.to_thread(raw_response_cache.load_entry, cache_url)
+    headers = _request_headers(entry, fmt)
+
+    try:
+        async with http_client.async_stream('GET', url, headers=headers, timeout=30,
+                                            deadline=IMF_DEADLINE_SECONDS) as response:
+            if response.status_code == 304 and entry:
+                print("IMF data unchanged since last fetch, replaying archived response")
+                await asyncio.to_thread(raw_response_cache.touch_entry, entry)
+                columns = await asyncio.to_thread(parse_archived, entry, fmt)
+
+            elif response.status_code == 404:
+                print(f"No IMF data found for {start_date} to {end_date}")
+                return pd.DataFrame()
+
+            elif response.status_code != 200:
+                print(f"Error fetching from IMF API: HTTP {response.status_code}")
+                return None
+
+            else:
+                chunk_queue = queue.SimpleQueue()
+                parsing = asyncio.ensure_future(asyncio.to_thread(
+                    _archive_and_parse,
+                    cache_url,
+                    _queued_chunks(chunk_queue),
+                    response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    fmt,
+                ))
+                try:
+                    async for chunk in response.aiter_bytes():
+                        # Stop downloading if the parser already failed
+                        if parsing.done():
+                            break
+                        chunk_queue.put(chunk)
+                except BaseException as e:
+                    # Abort the parser (and discard the partial archive) before giving up
+                    chunk_queue.put(e)
+                    await asyncio.gather(parsing, return_exceptions=True)
+                    raise
+                chunk_queue.put(None)
+                columns = await parsing
+
+    except (ET.ParseError, pd.errors.ParserError) as e:
+        print(f"Error parsing {fmt.upper()}: {e}")
+        # A truncated payload may already be archived; don't replay it on HTTP 304
+        await asyncio.to_thread(raw_response_cache.remove_entry, cache_url)
+        return None
+    except Exception as e:
+        print(f"Error fetching from IMF API: {e}")
+        return None
+
+    if not columns['Country']:
+        return pd.DataFrame()
+
+    currencies = await resolve_currencies_async(columns['Country'])
+    return columns_to_dataframe(columns, currencies)
 
 
 def last_month_year_month():
@@ -166,6 +979,52 @@ def last_month_year_month():
     return last_month.strftime("%Y_%m")
 
 
+class FetchResult:
+    """
+    A saved month of exchange rates, as returned by fetch_last_month_result. When the
+    month was fetched by this call, the DataFrame that was written is carried along;
+    for a month already on disk it is only read from the CSV on first access.
+    """
+
+    def __init__(self, path, year_month, df=None):
+        self.path = path
+        self.year_month = year_month  # Integer YYYYMM
+        self.fetched = df is not None  # False if the file already existed
+        self._df = df
+
+    @property
+    def df(self):
+        """The month's exchange rate DataFrame (loaded from the CSV on first access)"""
+        if self._df is None:
+            self._df = pd.read_csv(self.path, encoding='utf-8-sig')
+        return self._df
+
+    @property
+    def row_count(self):
+        """Number of rows; for a month that is not loaded, read from the FX store's Parquet footer"""
+        if self._df is None:
+            stored = fx_store.month_row_count(self.year_month)
+            if stored is not None:
+                return stored
+        return len(self.df)
+
+    @property
+    def file_size(self):
+        """Size of the CSV file in bytes"""
+        return os.path.getsize(self.path)
+
+    @property
+    def modified_at(self):
+        """Time the CSV file was last written"""
+        return datetime.fromtimestamp(os.path.getmtime(self.path))
+
+    def __fspath__(self):
+        return self.path
+
+    def __repr__(self):
+        return f"FetchResult(path={self.path!r}, year_month={self.year_month}, fetched={self.fetched})"
+
+
 def fetch_last_month_rates():
     """
     Fetches last month's exchange rates from IMF API and saves them as CSV.
@@ -173,41 +1032,465 @@ def fetch_last_month_rates():
     Returns:
         Path to the saved CSV file
     """
+    return fetch_last_month_result().path
+
+
+def fetch_last_month_result():
+    """
+    Fetches last month's exchange rates from IMF API and saves them as CSV, like
+    fetch_last_month_rates, but returns the data along with the path so callers do
+    not have to read back the file that was just written.
+
+    Returns:
+        FetchResult for last month
+    """
     ym = last_month_year_month()
+    year_month = int(ym.replace('_', ''))
     filename = f"exchange_rates_{ym}.csv"
     full_path = os.path.join(BASE_DIR, filename)
 
-    # If file exists → idempotent (don't re-fetch)
+    # If file exists → idempotent (don't re-fetch); the data is loaded only if used
     if os.path.exists(full_path):
         print(f"Exchange rate file already exists: {full_path}")
-        return full_path
+        return FetchResult(full_path, year_month)
 
     os.makedirs(BASE_DIR, exist_ok=True)
 
-    # Calculate date range for last month
-    today = datetime.today()
-    first = today.replace(day=1)
-    last_month_date = first - timedelta(days=1)
-    
-    start_date = last_month_date.strftime("%Y-%m")
-    end_date = last_month_date.strftime("%Y-%m")
-    
-    print(f"Fetching exchange rate data for {start_date}...")
-    
-    # Fetch data from IMF API
-    xml_data = get_currency_data_from_imf(start_date, end_date)
-    
-    if not xml_data:
-        raise Exception("Failed to fetch exchange rate data from IMF API")
-    
-    # Process XML to DataFrame
-    df = process_xml_to_dataframe(xml_data)
-    
-    if df.empty:
-        raise Exception("No exchange rate data found for the specified period")
-    
-    # Save to CSV
-    df.to_csv(full_path, index=False, encoding='utf-8-sig', sep=',')
-    print(f"Exchange rate data saved to: {full_path}")
-    
-    return full_path
+    # Single-flight: concurrent runs for the same month queue on the lock, and all
+    # but the first find the file it published instead of fetching again
+    with file_lock(full_path + LOCK_SUFFIX):
+        if os.path.exists(full_path):
+            print(f"Exchange rate file published by a concurrent run: {full_path}")
+            return FetchResult(full_path, year_month)
+
+        # Calculate date range for last month
+        today = datetime.today()
+        first = today.replace(day=1)
+        last_month_date = first - timedelta(days=1)
+
+        start_date = last_month_date.strftime("%Y-%m")
+        end_date = last_month_date.strftime("%Y-%m")
+
+        print(f"Fetching exchange rate data for {start_date}...")
+
+        # Fetch data from IMF API, archiving and parsing the response as it streams in
+        df = fetch_rates_streaming(start_date, end_date)
+
+        if df is None:
+            raise Exception("Failed to fetch exchange rate data from IMF API")
+
+        if df.empty:
+            raise Exception("No exchange rate data found for the specified period")
+
+        # Save to CSV and to the consolidated FX store
+        publish_csv(df, full_path)
+        fx_store.write_months(df)
+        print(f"Exchange rate data saved to: {full_path}")
+
+    return FetchResult(full_path, year_month, df)
+
+
+def monthly_file_path(year_month):
+    """Get the path of the monthly CSV file for an integer YYYYMM month"""
+    return os.path.join(BASE_DIR, f"exchange_rates_{year_month // 100:04d}_{year_month % 100:02d}.csv")
+
+
+def month_locks(months):
+    """Single-flight lock on the monthly CSV files of several months (see utils.file_lock)"""
+    return file_locks(monthly_file_path(year_month) + LOCK_SUFFIX for year_month in months)
+
+
+def last_month_period():
+    """Get last month as an integer YYYYMM"""
+    return int(last_month_year_month().replace('_', ''))
+
+
+def publish_csv(df, full_path):
+    """Write a CSV via a temporary file and rename, so readers never see a partial file"""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix=".tmp")
+    os.close(fd)
+    try:
+        df.to_csv(tmp_path, index=False, encoding='utf-8-sig', sep=',')
+        os.replace(tmp_path, full_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _next_month(year_month):
+    """Get the integer YYYYMM month following year_month"""
+    return year_month + 89 if year_month % 100 == 12 else year_month + 1
+
+
+def _month_sequence(start_date, end_date):
+    """List the integer YYYYMM months from start_date to end_date ('YYYY-MM'), inclusive"""
+    year_month = int(start_date[:4]) * 100 + int(start_date[5:7])
+    end = int(end_date[:4]) * 100 + int(end_date[5:7])
+    months = []
+    while year_month <= end:
+        months.append(year_month)
+        year_month = _next_month(year_month)
+    return months
+
+
+def _format_period(year_month):
+    """Format an integer YYYYMM month as the IMF period string 'YYYY-MM'"""
+    return f"{year_month // 100:04d}-{year_month % 100:02d}"
+
+
+def _month_windows(months, window_months):
+    """Split sorted YYYYMM months into runs of consecutive months, each at most window_months long"""
+    windows = []
+    for year_month in months:
+        if windows and len(windows[-1]) < window_months and _next_month(windows[-1][-1]) == year_month:
+            windows[-1].append(year_month)
+        else:
+            windows.append([year_month])
+    return windows
+
+
+def _parse_payload(xml_data):
+    """Parse an XML payload into column buffers (runs in a worker process)"""
+    return parse_sdmx_xml(io.BytesIO(xml_data.encode("utf-8")))
+
+
+def write_monthly_files(df, months=None):
+    """
+    Splits an exchange rate DataFrame into per-month CSV files in a single groupby pass,
+    and writes the same months to the consolidated FX store.
+
+    Args:
+        df: DataFrame as returned by process_xml_to_dataframe
+        months: Optional set of integer YYYYMM months to write; other months are skipped
+
+    Returns:
+        Dict mapping each written YYYYMM month to its CSV path
+    """
+    os.makedirs(BASE_DIR, exist_ok=True)
+
+    written = {}
+    for year_month, month_df in df.groupby('Date', sort=True):
+        if months is not None and year_month not in months:
+            continue
+        full_path = monthly_file_path(year_month)
+        publish_csv(month_df, full_path)
+        fx_store.write_months(month_df)
+        print(f"Exchange rate data saved to: {full_path}")
+        written[year_month] = full_path
+
+    return written
+
+
+def backfill_rates(start_date, end_date=None, max_concurrency=BACKFILL_MAX_CONCURRENCY,
+                   window_months=BACKFILL_WINDOW_MONTHS):
+    """
+    Fetches the exchange rates for a range of months and saves one CSV per month.
+    Months whose CSV already exists are skipped. The remaining months are split into
+    windows that are downloaded concurrently and parsed in a process pool; currencies
+    are resolved once for all windows.
+
+    Args:
+        start_date: First month to fetch, in format 'YYYY-MM'
+        end_date: Last month to fetch, in format 'YYYY-MM' (defaults to last month)
+        max_concurrency: Maximum number of IMF requests and parser processes in flight
+        window_months: Maximum number of months requested per IMF query
+
+    Returns:
+        Dict mapping each written YYYYMM month to its CSV path
+    """
+    if not end_date:
+        end_date = last_month_year_month().replace('_', '-')
+
+    missing = [
+        year_month for year_month in _month_sequence(start_date, end_date)
+        if not os.path.exists(monthly_file_path(year_month))
+    ]
+    if not missing:
+        print(f"All exchange rate files from {start_date} to {end_date} already exist")
+        return {}
+
+    os.makedirs(BASE_DIR, exist_ok=True)
+
+    # Single-flight per month: wait for concurrent runs, then skip what they published
+    with month_locks(missing):
+        missing = [year_month for year_month in missing if not os.path.exists(monthly_file_path(year_month))]
+        if not missing:
+            print(f"All exchange rate files from {start_date} to {end_date} were fetched by a concurrent run")
+            return {}
+
+        windows = _month_windows(missing, window_months)
+        print(f"Backfilling {len(missing)} months in {len(windows)} IMF requests...")
+
+        parsed = []
+        failed = []
+
+        with ThreadPoolExecutor(max_workers=max_concurrency) as fetch_pool, \
+                ProcessPoolExecutor(max_workers=max_concurrency) as parse_pool:
+            fetches = {
+                fetch_pool.submit(get_currency_data_from_imf, _format_period(window[0]), _format_period(window[-1])): window
+                for window in windows
+            }
+            parses = {}
+            for future in as_completed(fetches):
+                window = fetches[future]
+                xml_data = future.result()
+                if xml_data is None:
+                    failed.append(window)
+                    continue
+                if not xml_data:
+                    # HTTP 404: the IMF has no data for this window yet
+                    print(f"No IMF data for {_format_period(window[0])}..{_format_period(window[-1])}, skipping")
+                    continue
+                # Parse each window as soon as it arrives, while other downloads continue
+                parses[parse_pool.submit(_parse_payload, xml_data)] = window
+
+            for future in as_completed(parses):
+                parsed.append((parses[future], future.result()))
+
+        # Resolve the currencies of every window in one batched lookup
+        currencies = resolve_currencies(
+            country_code for _, columns in parsed for country_code in columns['Country']
+        )
+
+        written = {}
+        for window, columns in parsed:
+            if columns['Country']:
+                written.update(write_monthly_files(columns_to_dataframe(columns, currencies), set(window)))
+
+        if failed:
+            periods = ", ".join(f"{_format_period(w[0])}..{_format_period(w[-1])}" for w in failed)
+            raise Exception(f"Failed to fetch exchange rate data from IMF API for {periods}")
+
+        return written
+
+
+def existing_months():
+    """List the integer YYYYMM months that already have a monthly CSV file in BASE_DIR"""
+    if not os.path.isdir(BASE_DIR):
+        return []
+
+    months = []
+    for filename in os.listdir(BASE_DIR):
+        match = MONTHLY_FILE_PATTERN.match(filename)
+        if match:
+            months.append(int(match.group(1)) * 100 + int(match.group(2)))
+    return sorted(months)
+
+
+def find_missing_months():
+    """
+    Lists the months without a CSV file, from the earliest stored month up to last month.
+    If no month is stored yet, only last month is missing.
+
+    Returns:
+        Sorted list of integer YYYYMM months
+    """
+    last_month = last_month_year_month().replace('_', '-')
+    stored = existing_months()
+    if not stored:
+        return _month_sequence(last_month, last_month)
+
+    stored = set(stored)
+    return [
+        year_month for year_month in _month_sequence(_format_period(min(stored)), last_month)
+        if year_month not in stored
+    ]
+
+
+def fetch_missing_rates():
+    """
+    Catches up on months that were skipped (e.g. worker down on the scheduled day).
+    All missing months are fetched with a single IMF query spanning the gap, and the
+    response is split into per-month CSV files. Months already stored are not rewritten.
+
+    Returns:
+        Dict mapping each written YYYYMM month to its CSV path
+    """
+    missing = find_missing_months()
+    if not missing:
+        print("No missing exchange rate months")
+        return {}
+
+    os.makedirs(BASE_DIR, exist_ok=True)
+
+    # Single-flight per month: wait for concurrent runs, then skip what they published
+    with month_locks(missing):
+        missing = [year_month for year_month in missing if not os.path.exists(monthly_file_path(year_month))]
+        if not missing:
+            print("Missing exchange rate months were fetched by a concurrent run")
+            return {}
+
+        start_date, end_date = _format_period(missing[0]), _format_period(missing[-1])
+        print(f"Catching up {len(missing)} missing months from {start_date} to {end_date}...")
+
+        df = fetch_rates_streaming(start_date, end_date)
+
+        if df is None:
+            raise Exception("Failed to fetch exchange rate data from IMF API")
+
+        if df.empty:
+            raise Exception("No exchange rate data found for the specified period")
+
+        return write_monthly_files(df, set(missing))
+
+
+async def fetch_months_async(months, window_months=BACKFILL_WINDOW_MONTHS,
+                             max_concurrency=ASYNC_MAX_CONCURRENCY, fmt='xml'):
+    """
+    Fetches a set of months on one event loop and saves one CSV per month. Months are
+    grouped into windows that download concurrently; each window is written (in a
+    worker thread) as soon as it arrives, while the others are still downloading.
+
+    Args:
+        months: Iterable of integer YYYYMM months, e.g. from find_missing_months()
+        window_months: Maximum number of months requested per IMF query
+        max_concurrency: Maximum number of IMF requests in flight
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
+
+    Returns:
+        Dict mapping each written YYYYMM month to its CSV path
+    """
+    months = sorted(months)
+    if not months:
+        return {}
+
+    os.makedirs(BASE_DIR, exist_ok=True)
+
+    # Single-flight per month: wait (in a worker thread) for concurrent runs to finish
+    # the same months, then skip what they published
+    locks = contextlib.ExitStack()
+    await asyncio.to_thread(locks.enter_context, month_locks(months))
+    try:
+        months = [year_month for year_month in months if not os.path.exists(monthly_file_path(year_month))]
+        return await _fetch_windows_async(months, window_months, max_concurrency, fmt)
+    finally:
+        await asyncio.to_thread(locks.close)
+
+
+async def _fetch_windows_async(months, window_months, max_concurrency, fmt):
+    windows = _month_windows(months, window_months)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch_window(window):
+        async with semaphore:
+            df = await fetch_rates_async(_format_period(window[0]), _format_period(window[-1]), fmt=fmt)
+        return window, df
+
+    written = {}
+    failed = []
+
+    for future in asyncio.as_completed([fetch_window(window) for window in windows]):
+        window, df = await future
+        if df is None:
+            failed.append(window)
+        elif not df.empty:
+            written.update(await asyncio.to_thread(write_monthly_files, df, set(window)))
+
+    if failed:
+        periods = ", ".join(f"{_format_period(w[0])}..{_format_period(w[-1])}" for w in failed)
+        raise Exception(f"Failed to fetch exchange rate data from IMF API for {periods}")
+
+    return written
+
+
+def _load_fetch_state():
+    try:
+        with open(FETCH_STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_fetch_state(state):
+    os.makedirs(os.path.dirname(FETCH_STATE_PATH), exist_ok=True)
+    with open(FETCH_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4)
+
+
+def merge_month_revisions(month_df, full_path):
+    """
+    Merges revised observations into a stored monthly CSV, rewriting it only if
+    at least one rate actually changed or a new country appeared.
+
+    Args:
+        month_df: Revised rows for one month, as returned by process_xml_to_dataframe
+        full_path: Path of the stored monthly CSV
+
+    Returns:
+        Number of rows that changed
+    """
+    revised = month_df.astype({'Country': str}).set_index('Country')
+    stored = pd.read_csv(full_path, encoding='utf-8-sig')
+    stored_rates = stored.set_index('Country')['Exchange_Rate'].reindex(revised.index)
+
+    # New countries compare as NaN and therefore count as changed
+    changed = revised[stored_rates.ne(revised['Exchange_Rate'])]
+    if changed.empty:
+        return 0
+
+    merged = pd.concat(
+        [stored[~stored['Country'].isin(changed.index)], changed.reset_index()[month_df.columns]],
+        ignore_index=True,
+    )
+    merged = merged.sort_values(['Country', 'Date'])
+    publish_csv(merged, full_path)
+    fx_store.write_months(merged)
+    return len(changed)
+
+
+def fetch_revisions():
+    """
+    Picks up IMF revisions to months that are already stored. Only series updated
+    since the last successful check are requested (SDMX updatedAfter), and only
+    months with changed observations are rewritten. The first call just records
+    the current time as the starting point.
+
+    Returns:
+        Dict mapping each revised YYYYMM month to its number of changed rows
+    """
+    state = _load_fetch_state()
+    checked_at = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    updated_after = state.get('last_successful_fetch')
+    stored = existing_months()
+
+    if not updated_after or not stored:
+        print("No previous revision check recorded, starting from now")
+        _save_fetch_state(dict(state, last_successful_fetch=checked_at))
+        return {}
+
+    start_date, end_date = _format_period(stored[0]), _format_period(stored[-1])
+    print(f"Checking for IMF revisions to {start_date}..{end_date} since {updated_after}...")
+
+    xml_data = get_currency_data_from_imf(start_date, end_date, updated_after=updated_after)
+
+    if xml_data is None:
+        raise Exception("Failed to fetch exchange rate revisions from IMF API")
+
+    revised = {}
+    df = process_xml_to_dataframe(xml_data) if xml_data else pd.DataFrame()
+    if not df.empty:
+        stored = set(stored)
+        for year_month, month_df in df.groupby('Date', sort=True):
+            if year_month not in stored:
+                continue
+            with month_locks([year_month]):
+                changed = merge_month_revisions(month_df, monthly_file_path(year_month))
+            if changed:
+                print(f"Merged {changed} revised rows into {monthly_file_path(year_month)}")
+                revised[year_month] = changed
+
+    _save_fetch_state(dict(state, last_successful_fetch=checked_at))
+    return revised
+
+
+def sync_fx_store():
+    """
+    Imports monthly CSV files that are not yet in the consolidated FX store
+    (e.g. files written before the store existed).
+
+    Returns:
+        List of the imported YYYYMM months
+    """
+    return fx_store.import_csv_months({
+        year_month: monthly_file_path(year_month) for year_month in existing_months()
+    })
@@ -0,0 +1,151 @@
+import contextlib
+import os
+import socket
+import threading
+import time
+import uuid
+
+# A lock not refreshed for this long is assumed to belong to a crashed run and is broken;
+# the holder refreshes it every HEARTBEAT_SECONDS (or more often for short stale_after)
+STALE_AFTER_SECONDS = 15 * 60
+HEARTBEAT_SECONDS = 60
+
+# How long to wait for another run's lock before giving up, and how often to check it
+WAIT_TIMEOUT_SECONDS = 20 * 60
+POLL_INTERVAL_SECONDS = 0.5
+
+# On Windows a lock file cannot be read, touched or removed while another process has
+# it open (e.g. a waiter reading its token); such operations are retried briefly
+BUSY_RETRIES = 20
+BUSY_RETRY_SECONDS = 0.05
+
+
+def _try_create(path, token):
+    """Atomically create the lock file holding the owner's token; returns False if it already exists"""
+    try:
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        return False
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    return True
+
+
+def _retry_busy(operation, *args):
+    """Runs a file operation, retrying while the file is held open elsewhere (PermissionError)"""
+    for attempt in range(BUSY_RETRIES):
+        try:
+            return operation(*args)
+        except PermissionError:
+            if attempt == BUSY_RETRIES - 1:
+                raise
+            time.sleep(BUSY_RETRY_SECONDS)
+
+
+def _read_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def _read_token(path):
+    try:
+        return _retry_busy(_read_file, path)
+    except FileNotFoundError:
+        return None
+
+
+def _remove_if_owner(path, token):
+    """Remove the lock file only if it still holds the given token"""
+    if _read_token(path) == token:
+        with contextlib.suppress(FileNotFoundError):
+            _retry_busy(os.remove, path)
+
+
+def _break_if_stale(path, stale_after):
+    try:
+        token = _read_token(path)
+        age = time.time() - os.path.getmtime(path)
+    except FileNotFoundError:
+        return
+    except OSError as e:
+        # Busy for longer than the retries; check again on the next poll
+        print(f"Warning: Could not check lock {path}: {e}")
+        return
+    if token is not None and age > stale_after:
+        print(f"Warning: Breaking stale lock {path} ({age:.0f}s old)")
+        # Another waiter may have broken it and taken a new lock meanwhile
+        try:
+            _remove_if_owner(path, token)
+        except OSError as e:
+            print(f"Warning: Could not break stale lock {path}: {e}")
+
+
+def _heartbeat(path, token, interval, stop):
+    """Refresh the lock's modification time while it is held, so waiters don't break it"""
+    while not stop.wait(interval):
+        try:
+            if _read_token(path) != token:
+                print(f"Warning: Lock {path} was taken over by another run")
+                return
+            with contextlib.suppress(FileNotFoundError):
+                _retry_busy(os.utime, path)
+        except OSError as e:
+            # Keep the heartbeat alive; the next refresh is well within stale_after
+            print(f"Warning: Could not refresh lock {path}: {e}")
+
+
+@contextlib.contextmanager
+def file_lock(path, timeout=WAIT_TIMEOUT_SECONDS, stale_after=STALE_AFTER_SECONDS,
+              poll_interval=POLL_INTERVAL_SECONDS):
+    """
+    Holds an exclusive lock, shared by all processes and threads on the machine (and by
+    machines sharing the directory), for the duration of the with block. The lock is a
+    file created with O_CREAT | O_EXCL, which works the same on Windows and POSIX. The
+    holder refreshes the file's modification time in a background thread, so a lock
+    left behind by a crashed run is broken once it has not been refreshed for
+    stale_after, however long a live holder keeps it. The file holds a token unique to
+    the owner, and is only removed on release if it still holds that token.
+
+    Args:
+        path: Path of the lock file
+        timeout: Seconds to wait for the lock before raising TimeoutError
+        stale_after: Seconds without a refresh after which an existing lock is considered stale
+        poll_interval: Seconds between attempts while the lock is held elsewhere
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    token = f"{socket.gethostname()} {os.getpid()} {time.time()} {uuid.uuid4().hex}\n"
+    started = time.monotonic()
+
+    while not _try_create(path, token):
+        _break_if_stale(path, stale_after)
+        if time.monotonic() - started > timeout:
+            raise TimeoutError(f"Timed out after {timeout}s waiting for lock {path}")
+        time.sleep(poll_interval)
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(path, token, min(HEARTBEAT_SECONDS, stale_after / 3), stop), daemon=True
+    )
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+        try:
+            _remove_if_owner(path, token)
+        except OSError as e:
+            # Not fatal to the work done under the lock; waiters break it once it is stale
+            print(f"Warning: Could not release lock {path}: {e}")
+
+
+@contextlib.contextmanager
+def file_locks(paths, **kwargs):
+    """
+    Holds several file locks at once. They are always taken in sorted order, so runs
+    locking overlapping sets cannot deadlock. See file_lock for the arguments.
+    """
+    with contextlib.ExitStack() as stack:
+        for path in sorted(set(paths)):
+            stack.enter_context(file_lock(path, **kwargs))
+        yield
@@ -0,0 +1,166 @@
+import bisect
+import json
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+from utils import fx_store
+from utils.exchange_rate_fetcher import existing_months, monthly_file_path
+
+# Per-month lookup indexes, cached on disk next to the monthly data:
+# fx_index/YYYY_MM.json holds {"country": {code: rate}, "currency": {code: rate}}
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "fx_index")
+
+# Rates are quoted in USD per unit of the local currency
+BASE_CURRENCY = 'USD'
+
+# Months loaded into memory so far, filled lazily on first access
+_loaded = {}
+_loaded_lock = threading.Lock()
+
+
+def _month_key(year_month):
+    """Normalise 202511, '202511', '2025-11' or '2025_11' to the integer 202511"""
+    if isinstance(year_month, str):
+        digits = year_month.replace('-', '').replace('_', '')
+        return int(digits)
+    return int(year_month)
+
+
+def available_months():
+    """List the integer YYYYMM months available in data/ (monthly CSVs or FX store)"""
+    return sorted(set(existing_months()) | set(fx_store.stored_months()))
+
+
+def _source_path(year_month):
+    """Get the file the index for a month is built from, preferring the FX store"""
+    path = fx_store.partition_path(year_month)
+    if os.path.exists(path):
+        return path
+    path = monthly_file_path(year_month)
+    return path if os.path.exists(path) else None
+
+
+def _build_index(source_path):
+    if source_path.endswith(".parquet"):
+        df = pd.read_parquet(source_path, columns=['Country', 'Currency', 'Exchange_Rate'])
+    else:
+        df = pd.read_csv(source_path, encoding='utf-8-sig', usecols=['Country', 'Currency', 'Exchange_Rate'])
+
+    df = df.astype({'Country': object, 'Currency': object})
+    by_country = dict(zip(df['Country'], df['Exchange_Rate']))
+
+    # Several countries can share a currency (e.g. EUR); keep the first rate seen
+    with_currency = df.dropna(subset=['Currency']).drop_duplicates('Currency')
+    by_currency = dict(zip(with_currency['Currency'], with_currency['Exchange_Rate']))
+    by_currency.setdefault(BASE_CURRENCY, 1.0)
+
+    return {"country": by_country, "currency": by_currency}
+
+
+def _load_month(year_month):
+    """
+    Loads the lookup index for one month, from the on-disk index if it is newer than
+    its source file, otherwise by rebuilding it from the source.
+
+    Returns:
+        Dict with 'country' and 'currency' maps, or None if the month is not stored
+    """
+    with _loaded_lock:
+        if year_month in _loaded:
+            return _loaded[year_month]
+
+    source_path = _source_path(year_month)
+    if source_path is None:
+        return None
+
+    index_path = os.path.join(INDEX_DIR, f"{year_month // 100:04d}_{year_month % 100:02d}.json")
+    index = None
+    if os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(source_path):
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = None
+
+    if index is None:
+        index = _build_index(source_path)
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=INDEX_DIR, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_path)
+
+    with _loaded_lock:
+        _loaded[year_month] = index
+    return index
+
+
+def clear_loaded():
+    """Forget the in-memory indexes (e.g. after new months or revisions were written)"""
+    with _loaded_lock:
+        _loaded.clear()
+
+
+def get_rate(code, year_month, by="country"):
+    """
+    Looks up the USD rate (USD per unit of local currency) for a country or currency in a month.
+
+    Args:
+        code: Country code (e.g. 'ABW') or currency code (e.g. 'AWG')
+        year_month: Month as 202511, '2025-11' or '2025_11'
+        by: 'country' or 'currency', selecting what code refers to
+
+    Returns:
+        The rate as float, or None if it is not available
+    """
+    index = _load_month(_month_key(year_month))
+    if index is None:
+        return None
+    return index[by].get(code)
+
+
+def get_rates_bulk(requests, by="country"):
+    """
+    Looks up many (code, month) pairs, loading each month's index only once.
+
+    Args:
+        requests: Iterable of (code, year_month) pairs
+        by: 'country' or 'currency', selecting what the codes refer to
+
+    Returns:
+        Dict mapping each (code, integer YYYYMM) pair to its rate (or None)
+    """
+    rates = {}
+    for code, year_month in requests:
+        year_month = _month_key(year_month)
+        index = _load_month(year_month)
+        rates[(code, year_month)] = index[by].get(code) if index is not None else None
+    return rates
+
+
+def get_series(code, start_month=None, end_month=None, by="country"):
+    """
+    Gets the monthly rate history of a country or currency.
+
+    Args:
+        code: Country or currency code
+        start_month: Optional first month (defaults to the earliest stored month)
+        end_month: Optional last month (defaults to the latest stored month)
+        by: 'country' or 'currency', selecting what code refers to
+
+    Returns:
+        Dict mapping integer YYYYMM months to rates, for months where the code has a rate
+    """
+    months = available_months()
+    lo = bisect.bisect_left(months, _month_key(start_month)) if start_month is not None else 0
+    hi = bisect.bisect_right(months, _month_key(end_month)) if end_month is not None else len(months)
+
+    series = {}
+    for year_month in months[lo:hi]:
+        index = _load_month(year_month)
+        if index is not None and code in index[by]:
+            series[year_month] = index[by][code]
+    return series
@@ -0,0 +1,162 @@
+import os
+import re
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Consolidated FX store: one Parquet file per month, hive-partitioned as
+# fx_store/year=2025/month=11/rates.parquet, alongside the monthly CSV files
+STORE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "fx_store")
+PARTITION_FILENAME = "rates.parquet"
+
+_DICT_STRING = pa.dictionary(pa.int32(), pa.string())
+
+SCHEMA = pa.schema([
+    ("Country", _DICT_STRING),
+    ("Currency", _DICT_STRING),
+    ("Date", pa.int32()),
+    ("Exchange_Rate", pa.float64()),
+    ("Base_Currency", _DICT_STRING),
+    ("Timestamp", pa.timestamp("us")),
+])
+
+PARTITIONING = ds.partitioning(pa.schema([("year", pa.int16()), ("month", pa.int8())]), flavor="hive")
+
+_YEAR_PATTERN = re.compile(r"^year=(\d{4})$")
+_MONTH_PATTERN = re.compile(r"^month=(\d{1,2})$")
+
+
+def partition_path(year_month, store_dir=STORE_DIR):
+    """Get the Parquet file path holding an integer YYYYMM month"""
+    return os.path.join(store_dir, f"year={year_month // 100}", f"month={year_month % 100}", PARTITION_FILENAME)
+
+
+def _to_table(df):
+    """Convert an exchange rate DataFrame to an Arrow table with the store schema"""
+    df = df[list(SCHEMA.names)].astype({
+        'Country': 'category',
+        'Currency': 'category',
+        'Date': 'int32',
+        'Exchange_Rate': 'float64',
+        'Base_Currency': 'category',
+    })
+    df['Timestamp'] = pd.to_datetime(df['Timestamp']).astype('datetime64[us]')
+    return pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+
+def write_months(df, store_dir=STORE_DIR):
+    """
+    Writes (or replaces) the store partitions for every month in the DataFrame.
+    Each partition is written to a temporary file and renamed into place, so
+    readers never see a partially written month.
+
+    Args:
+        df: Exchange rate DataFrame with an integer YYYYMM Date column
+
+    Returns:
+        List of the written YYYYMM months
+    """
+    written = []
+    for year_month, month_df in df.groupby('Date', sort=True):
+        year_month = int(year_month)
+        path = partition_path(year_month, store_dir)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Dot-prefixed, so dataset scans (read_range) ignore a half-written or leftover file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".", suffix=".tmp")
+        os.close(fd)
+        try:
+            pq.write_table(_to_table(month_df), tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        written.append(year_month)
+    return written
+
+
+def stored_months(store_dir=STORE_DIR):
+    """List the integer YYYYMM months present in the store"""
+    months = []
+    if not os.path.isdir(store_dir):
+        return months
+
+    for year_dir in os.listdir(store_dir):
+        year_match = _YEAR_PATTERN.match(year_dir)
+        if not year_match:
+            continue
+        for month_dir in os.listdir(os.path.join(store_dir, year_dir)):
+            month_match = _MONTH_PATTERN.match(month_dir)
+            if month_match and os.path.exists(os.path.join(store_dir, year_dir, month_dir, PARTITION_FILENAME)):
+                months.append(int(year_match.group(1)) * 100 + int(month_match.group(1)))
+    return sorted(months)
+
+
+def month_row_count(year_month, store_dir=STORE_DIR):
+    """Get the number of rows stored for a month from its Parquet footer, or None if it is not stored"""
+    path = partition_path(year_month, store_dir)
+    if not os.path.exists(path):
+        return None
+    return pq.read_metadata(path).num_rows
+
+
+def dataset(store_dir=STORE_DIR):
+    """Open the store as a pyarrow dataset (year/month partition columns included)"""
+    return ds.dataset(store_dir, format="parquet", partitioning=PARTITIONING)
+
+
+def read_range(start_month, end_month, countries=None, currencies=None, columns=None, store_dir=STORE_DIR):
+    """
+    Reads a range of months from the store in a single scan. Whole year partitions
+    outside the range are pruned, and the month and country filters are pushed down
+    to the Parquet reader.
+
+    Args:
+        start_month: First month as integer YYYYMM
+        end_month: Last month as integer YYYYMM
+        countries: Optional list of country codes to keep
+        currencies: Optional list of currency codes to keep
+        columns: Optional list of columns to read (defaults to all store columns)
+
+    Returns:
+        Pandas DataFrame sorted by Country and Date
+    """
+    if not os.path.isdir(store_dir):
+        return pd.DataFrame(columns=columns or SCHEMA.names)
+
+    expression = (
+        (ds.field("year") >= start_month // 100) & (ds.field("year") <= end_month // 100)
+        & (ds.field("Date") >= start_month) & (ds.field("Date") <= end_month)
+    )
+    if countries is not None:
+        expression &= ds.field("Country").isin(list(countries))
+    if currencies is not None:
+        expression &= ds.field("Currency").isin(list(currencies))
+
+    table = dataset(store_dir).to_table(columns=columns or SCHEMA.names, filter=expression)
+    df = table.to_pandas()
+
+    sort_columns = [c for c in ('Country', 'Date') if c in df.columns]
+    return df.sort_values(sort_columns, ignore_index=True) if sort_columns else df
+
+
+def import_csv_months(csv_paths, store_dir=STORE_DIR):
+    """
+    Loads monthly CSV files whose months are not yet in the store.
+
+    Args:
+        csv_paths: Dict mapping integer YYYYMM months to monthly CSV paths
+
+    Returns:
+        List of the imported YYYYMM months
+    """
+    present = set(stored_months(store_dir))
+    imported = []
+    for year_month, path in sorted(csv_paths.items()):
+        if year_month in present:
+            continue
+        imported.extend(write_months(pd.read_csv(path, encoding='utf-8-sig'), store_dir))
+    return imported
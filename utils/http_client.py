@@ -0,0 +1,243 @@
+import asyncio
+import contextlib
+import random
+import threading
+import time
+import weakref
+
+import httpx
+
+USER_AGENT = 'Python-Currency-App/1.0'
+
+# Retry settings: exponential backoff with full jitter on transient failures
+MAX_RETRIES = 4
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Per-attempt timeout and overall deadline (all attempts plus backoff) per call
+DEFAULT_TIMEOUT_SECONDS = 10
+DEFAULT_DEADLINE_SECONDS = 60
+
+# Keep-alive connection pool shared by all calls
+POOL_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+DEFAULT_HEADERS = {
+    'User-Agent': USER_AGENT,
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+# Async clients are bound to the event loop they were created on
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_client():
+    """Get the shared, connection-pooling synchronous HTTP client"""
+    global _client
+    with _client_lock:
+        if _client is None or _client.is_closed:
+            _client = httpx.Client(headers=DEFAULT_HEADERS, limits=POOL_LIMITS, follow_redirects=True)
+        return _client
+
+
+def get_async_client():
+    """Get the shared, connection-pooling asynchronous HTTP client for the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(headers=DEFAULT_HEADERS, limits=POOL_LIMITS, follow_redirects=True)
+        _async_clients[loop] = client
+    return client
+
+
+def _backoff_delay(attempt, response=None):
+    """
+    Get the delay before the next attempt. Honours a Retry-After header given in
+    seconds, otherwise uses exponential backoff with full jitter.
+    """
+    if response is not None:
+        retry_after = response.headers.get('Retry-After', '')
+        if retry_after.isdigit():
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _next_attempt(url, attempt, started, deadline, max_retries, response=None, error=None):
+    """
+    Decide whether a failed attempt is retried.
+
+    Returns:
+        Seconds to wait before retrying, or None if the call should give up
+    """
+    retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+    if not retryable or attempt >= max_retries:
+        return None
+
+    delay = _backoff_delay(attempt, response)
+    if time.monotonic() - started + delay >= deadline:
+        return None
+
+    reason = error if error is not None else f"HTTP {response.status_code}"
+    print(f"Warning: Request to {url} failed ({reason}), retrying in {delay:.1f}s...")
+    return delay
+
+
+def _attempt_timeout(url, started, timeout, deadline):
+    remaining = deadline - (time.monotonic() - started)
+    if remaining <= 0:
+        raise TimeoutError(f"Deadline of {deadline}s exceeded for {url}")
+    return min(timeout, remaining)
+
+
+def request(method, url, headers=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+            deadline=DEFAULT_DEADLINE_SECONDS, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Sends an HTTP request through the shared client, retrying transport errors and
+    429/5xx responses with exponential backoff and jitter.
+
+    Args:
+        method: HTTP method, e.g. 'GET'
+        url: Request URL
+        headers: Optional extra request headers
+        timeout: Timeout in seconds for a single attempt
+        deadline: Overall time budget in seconds for all attempts and backoff
+        max_retries: Maximum number of retries after the first attempt
+        **kwargs: Passed through to httpx.Client.request
+
+    Returns:
+        The final httpx.Response (which may still carry an error status)
+    """
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        attempt_timeout = _attempt_timeout(url, started, timeout, deadline)
+        try:
+            response = get_client().request(method, url, headers=headers, timeout=attempt_timeout, **kwargs)
+        except httpx.TransportError as e:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, error=e)
+            if delay is None:
+                raise
+        else:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, response=response)
+            if delay is None:
+                return response
+            response.close()
+
+        time.sleep(delay)
+        attempt += 1
+
+
+@contextlib.contextmanager
+def stream(method, url, headers=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+           deadline=DEFAULT_DEADLINE_SECONDS, max_retries=MAX_RETRIES):
+    """
+    Opens a streamed response through the shared client, so the body can be consumed
+    chunk by chunk (response.iter_bytes()) without holding it in memory. Connecting is
+    retried like request(); once the response headers arrive, the body is not retried.
+
+    Yields:
+        The httpx.Response (which may carry an error status); it is closed on exit
+    """
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        attempt_timeout = _attempt_timeout(url, started, timeout, deadline)
+        client = get_client()
+        try:
+            response = client.send(
+                client.build_request(method, url, headers=headers, timeout=attempt_timeout),
+                stream=True,
+            )
+        except httpx.TransportError as e:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, error=e)
+            if delay is None:
+                raise
+        else:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, response=response)
+            if delay is None:
+                break
+            response.close()
+
+        time.sleep(delay)
+        attempt += 1
+
+    try:
+        yield response
+    finally:
+        response.close()
+
+
+async def async_request(method, url, headers=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+                        deadline=DEFAULT_DEADLINE_SECONDS, max_retries=MAX_RETRIES, **kwargs):
+    """
+    Async counterpart of request(), using the shared async client of the running loop.
+
+    Returns:
+        The final httpx.Response (which may still carry an error status)
+    """
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        attempt_timeout = _attempt_timeout(url, started, timeout, deadline)
+        try:
+            response = await get_async_client().request(
+                method, url, headers=headers, timeout=attempt_timeout, **kwargs
+            )
+        except httpx.TransportError as e:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, error=e)
+            if delay is None:
+                raise
+        else:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, response=response)
+            if delay is None:
+                return response
+            await response.aclose()
+
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+@contextlib.asynccontextmanager
+async def async_stream(method, url, headers=None, timeout=DEFAULT_TIMEOUT_SECONDS,
+                       deadline=DEFAULT_DEADLINE_SECONDS, max_retries=MAX_RETRIES):
+    """
+    Async counterpart of stream(): opens a streamed response through the shared async
+    client of the running loop, so the body can be consumed with response.aiter_bytes().
+
+    Yields:
+        The httpx.Response (which may carry an error status); it is closed on exit
+    """
+    started = time.monotonic()
+    attempt = 0
+
+    while True:
+        attempt_timeout = _attempt_timeout(url, started, timeout, deadline)
+        client = get_async_client()
+        try:
+            response = await client.send(
+                client.build_request(method, url, headers=headers, timeout=attempt_timeout),
+                stream=True,
+            )
+        except httpx.TransportError as e:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, error=e)
+            if delay is None:
+                raise
+        else:
+            delay = _next_attempt(url, attempt, started, deadline, max_retries, response=response)
+            if delay is None:
+                break
+            await response.aclose()
+
+        await asyncio.sleep(delay)
+        attempt += 1
+
+    try:
+        yield response
+    finally:
+        await response.aclose()
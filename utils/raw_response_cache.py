@@ -0,0 +1,194 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import urllib.parse
+
+RAW_CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "raw_cache")
+
+# Payloads are stored once per distinct content under objects/, compressed;
+# queries/ maps each request (by its canonical URL) to the payload it last returned
+OBJECTS_DIR = "objects"
+QUERIES_DIR = "queries"
+
+
+def query_key(url):
+    """
+    Get the cache key for a request URL, independent of query parameter order.
+    The fragment is kept, so callers can use it to tell apart variants of the same
+    request that differ only in headers (e.g. the requested response format).
+    """
+    parts = urllib.parse.urlsplit(url)
+    params = sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True))
+    canonical = urllib.parse.urlunsplit(parts._replace(query=urllib.parse.urlencode(params)))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _object_path(content_hash, cache_dir):
+    return os.path.join(cache_dir, OBJECTS_DIR, content_hash[:2], f"{content_hash}.gz")
+
+
+def _query_path(url, cache_dir):
+    return os.path.join(cache_dir, QUERIES_DIR, f"{query_key(url)}.json")
+
+
+def _atomic_write(path, data):
+    """Write bytes to path via a temporary file and rename, so readers never see partial files"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def load_entry(url, cache_dir=RAW_CACHE_DIR):
+    """
+    Looks up the cached response for a request URL.
+
+    Returns:
+        Dict with 'url', 'content_hash', 'etag', 'last_modified' and 'fetched_at',
+        or None if the URL has not been cached (or its payload is missing)
+    """
+    try:
+        with open(_query_path(url, cache_dir), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not os.path.exists(_object_path(entry["content_hash"], cache_dir)):
+        return None
+    return entry
+
+
+def conditional_headers(entry):
+    """Build the revalidation headers (If-None-Match / If-Modified-Since) for a cached entry"""
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def open_body(entry, cache_dir=RAW_CACHE_DIR):
+    """Open a cached payload as a binary stream, decompressed on the fly"""
+    return gzip.open(_object_path(entry["content_hash"], cache_dir), "rb")
+
+
+def read_body(entry, cache_dir=RAW_CACHE_DIR):
+    """Read a cached payload into memory"""
+    with open_body(entry, cache_dir) as f:
+        return f.read()
+
+
+def _write_entry(url, content_hash, etag, last_modified, cache_dir):
+    entry = {
+        "url": url,
+        "content_hash": content_hash,
+        "etag": etag,
+        "last_modified": last_modified,
+        "fetched_at": time.time(),
+    }
+    _atomic_write(_query_path(url, cache_dir), json.dumps(entry).encode("utf-8"))
+    return entry
+
+
+def store_response(url, body, etag=None, last_modified=None, cache_dir=RAW_CACHE_DIR):
+    """
+    Stores a response payload (compressed, content-addressed) and maps the URL to it.
+
+    Args:
+        url: Request URL
+        body: Response payload as bytes
+        etag: ETag response header, if any
+        last_modified: Last-Modified response header, if any
+
+    Returns:
+        The stored entry dict
+    """
+    content_hash = hashlib.sha256(body).hexdigest()
+    object_path = _object_path(content_hash, cache_dir)
+    if not os.path.exists(object_path):
+        _atomic_write(object_path, gzip.compress(body))
+
+    return _write_entry(url, content_hash, etag, last_modified, cache_dir)
+
+
+def archive_chunks(url, chunks, etag=None, last_modified=None, cache_dir=RAW_CACHE_DIR):
+    """
+    Passes a streamed payload through unchanged while compressing it into the cache,
+    so a response can be archived and parsed in the same pass. The payload is only
+    published (and the URL mapped to it) once the stream has been fully consumed;
+    an interrupted stream leaves the cache untouched.
+
+    Args:
+        url: Request URL
+        chunks: Iterable of bytes chunks, e.g. response.iter_bytes()
+        etag: ETag response header, if any
+        last_modified: Last-Modified response header, if any
+
+    Yields:
+        The chunks of the payload
+    """
+    objects_dir = os.path.join(cache_dir, OBJECTS_DIR)
+    os.makedirs(objects_dir, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=objects_dir, suffix=".tmp")
+    digest = hashlib.sha256()
+
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+            for chunk in chunks:
+                digest.update(chunk)
+                archive.write(chunk)
+                yield chunk
+
+        content_hash = digest.hexdigest()
+        object_path = _object_path(content_hash, cache_dir)
+        if os.path.exists(object_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            os.replace(tmp_path, object_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    _write_entry(url, content_hash, etag, last_modified, cache_dir)
+
+
+def remove_entry(url, cache_dir=RAW_CACHE_DIR):
+    """Forget the payload cached for a request (e.g. one that turned out to be unparseable)"""
+    try:
+        os.remove(_query_path(url, cache_dir))
+    except FileNotFoundError:
+        pass
+
+
+def list_entries(cache_dir=RAW_CACHE_DIR):
+    """List the entries of every cached query, most recently fetched first"""
+    queries_dir = os.path.join(cache_dir, QUERIES_DIR)
+    if not os.path.isdir(queries_dir):
+        return []
+
+    entries = []
+    for filename in os.listdir(queries_dir):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(queries_dir, filename), "r", encoding="utf-8") as f:
+                entries.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return sorted(entries, key=lambda entry: entry["fetched_at"], reverse=True)
+
+
+def touch_entry(entry, cache_dir=RAW_CACHE_DIR):
+    """Record that a cached entry was successfully revalidated (HTTP 304)"""
+    return _write_entry(entry["url"], entry["content_hash"], entry.get("etag"), entry.get("last_modified"), cache_dir)
@@ -0,0 +1,156 @@
+import io
+import itertools
+from collections import namedtuple
+
+import pandas as pd
+
+from utils.exchange_rate_fetcher import (
+    columns_to_dataframe,
+    get_currency_data_from_imf,
+    parse_sdmx,
+    resolve_currencies,
+)
+
+# One table requested from the IMF ER dataflow. The series key dimensions are
+# COUNTRY.INDICATOR.TYPE_OF_TRANSFORMATION.FREQUENCY, e.g.:
+#   indicator:      'USD_XDC' (USD per local currency), 'XDR_XDC' (SDR per local currency)
+#   transformation: 'PA_RT' (period average), 'EOP_RT' (end of period)
+#   frequency:      'M', 'Q' or 'A'
+#   countries:      tuple of country codes, or None for all countries
+SeriesSpec = namedtuple(
+    'SeriesSpec',
+    ['indicator', 'transformation', 'frequency', 'countries'],
+    defaults=('USD_XDC', 'PA_RT', 'M', None),
+)
+
+# Per-Series columns used to split a combined response back into tables
+SERIES_COLUMNS = ('Indicator', 'Transformation', 'Frequency')
+
+
+def _join(values):
+    return "+".join(sorted(set(values)))
+
+
+def _covers(a, b):
+    """Whether dimension values a include all of b (None stands for every value)"""
+    return a is None or (b is not None and a >= b)
+
+
+def _union(a, b):
+    return None if a is None or b is None else a | b
+
+
+def _merge_requests(a, b):
+    """
+    Merged dimension values of two requests, or None if a single key covering both
+    would also fetch series neither of them asked for.
+    """
+    if all(map(_covers, a, b)):
+        return a
+    if all(map(_covers, b, a)):
+        return b
+    # A key fetches the cross product of its dimensions, which equals the union of
+    # the two requests only if they differ in no more than one dimension
+    if sum(x != y for x, y in zip(a, b)) == 1:
+        return tuple(map(_union, a, b))
+    return None
+
+
+def plan_requests(specs):
+    """
+    Combines series specs into few SDMX requests without fetching series that no spec
+    asked for. A spec already covered by another request (e.g. a country subset of an
+    all-countries spec) is served from that request's response, and two requests are
+    merged when they differ in a single dimension (country set, indicator,
+    transformation or frequency), which '+'-joins that dimension in the key. Specs
+    differing in several dimensions keep separate requests, since a combined key
+    would fetch their full cross product.
+
+    Args:
+        specs: Iterable of SeriesSpec
+
+    Returns:
+        List of (key, specs) tuples, one per request
+    """
+    # Dimension values of each request: countries (None for all), indicators,
+    # transformations, frequencies
+    requests = [
+        ((frozenset(spec.countries) if spec.countries else None,
+          frozenset([spec.indicator]), frozenset([spec.transformation]), frozenset([spec.frequency])),
+         [spec])
+        for spec in dict.fromkeys(specs)
+    ]
+
+    merged = True
+    while merged:
+        merged = False
+        for i, j in itertools.combinations(range(len(requests)), 2):
+            dims = _merge_requests(requests[i][0], requests[j][0])
+            if dims is not None:
+                requests[i] = (dims, requests[i][1] + requests[j][1])
+                del requests[j]
+                merged = True
+                break
+
+    plan = []
+    for (countries, indicators, transformations, frequencies), group in requests:
+        key = ".".join([
+            _join(countries) if countries else "",
+            _join(indicators),
+            _join(transformations),
+            _join(frequencies),
+        ])
+        plan.append((key, group))
+    return plan
+
+
+def _select(df, spec):
+    """Picks the rows of a combined response that belong to one spec"""
+    mask = (
+        (df['Indicator'] == spec.indicator)
+        & (df['Transformation'] == spec.transformation)
+        & (df['Frequency'] == spec.frequency)
+    )
+    if spec.countries:
+        mask &= df['Country'].isin(spec.countries)
+    return df.loc[mask].drop(columns=list(SERIES_COLUMNS)).reset_index(drop=True)
+
+
+def fetch_series(specs, start_date, end_date, fmt='xml'):
+    """
+    Fetches several exchange rate tables with as few IMF requests as possible, and
+    splits each response back into one table per spec. The Date column of quarterly
+    and annual tables holds the last month of the period (e.g. 2025-Q3 -> 202509).
+
+    Args:
+        specs: Iterable of SeriesSpec
+        start_date: Start period, e.g. '2024-01'
+        end_date: End period, e.g. '2025-12'
+        fmt: Response representation, 'xml' (SDMX-ML) or 'csv' (SDMX-CSV)
+
+    Returns:
+        Dict mapping each SeriesSpec to its DataFrame (empty if the API returned no data)
+    """
+    specs = list(dict.fromkeys(specs))
+    parsed = []
+
+    for key, group in plan_requests(specs):
+        payload = get_currency_data_from_imf(start_date, end_date, key=key, fmt=fmt)
+        if payload is None:
+            raise Exception(f"Failed to fetch exchange rate data from IMF API for key {key}")
+        if payload:
+            parsed.append((group, parse_sdmx(io.BytesIO(payload.encode("utf-8")), fmt)))
+
+    # Resolve the currencies of every response in one batched lookup
+    currencies = resolve_currencies(
+        country_code for _, columns in parsed for country_code in columns['Country']
+    )
+
+    tables = {spec: pd.DataFrame() for spec in specs}
+    for group, columns in parsed:
+        if not columns['Country']:
+            continue
+        df = columns_to_dataframe(columns, currencies, SERIES_COLUMNS)
+        for spec in group:
+            tables[spec] = _select(df, spec)
+    return tables
@@ -1,33 +1,41 @@
-import os
 import time
 from prefect.events import emit_event
+from utils import batch_queue
+from utils.core_processor import import_hotfolder_once
 
-WATCH_FOLDER = r"C:\DATA_PIPELINE\3_processing_hotfolder"
 EVENT_NAME = "local.manifest.created"
 
 
 def watcher(interval=5):
-    print("Starting Prefect hotfolder watcher...")
-    print(f"Monitoring: {WATCH_FOLDER}")
-    seen = set()
+    """
+    Emits a Prefect event for every batch enqueued by create_batch_manifest. Each poll
+    reads only the batches enqueued since the previous one from the batch queue,
+    instead of listing the hotfolder.
+    """
+    print("Starting Prefect batch queue watcher...")
+    print(f"Monitoring: {batch_queue.QUEUE_PATH}")
+
+    # Manifests prepared before the queue existed are enqueued (and announced) once
+    imported = import_hotfolder_once()
+    if imported:
+        print(f"Enqueued {len(imported)} ready manifests already in the hotfolder")
+    last_seq = 0
 
     while True:
-        for f in os.listdir(WATCH_FOLDER):
-            if f.endswith("_MANIFEST.json") and f not in seen:
-                filepath = os.path.join(WATCH_FOLDER, f)
-                seen.add(f)
-
-                print(f"Detected new manifest: {filepath}")
-
-                emit_event(
-                    event=EVENT_NAME,
-                    resource={
-                        "file_path": filepath,
-                        "event_type": "manifest_ready"
-                    }
-                )
-
-                print("Event emitted to Prefect Cloud.")
+        for seq, batch_id, filepath in batch_queue.enqueued_since(last_seq):
+            last_seq = seq
+
+            print(f"Detected new batch {batch_id}: {filepath}")
+
+            emit_event(
+                event=EVENT_NAME,
+                resource={
+                    "file_path": filepath,
+                    "event_type": "manifest_ready"
+                }
+            )
+
+            print("Event emitted to Prefect Cloud.")
 
         time.sleep(interval)
 